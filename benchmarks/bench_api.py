@@ -0,0 +1,89 @@
+"""Запросов в секунду к эндпоинтам /trading при промахе, попадании в Redis и в память процесса.
+
+Запуск (нужна БД из DATABASE_URL с данными; Redis заменяется словарём в памяти,
+чтобы замер не зависел от сети):
+    python benchmarks/bench_api.py [--seconds 5]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+
+from api_service.database import engine
+from api_service.local_cache import LocalCache, TwoTierCache
+from api_service.main import app
+from api_service.routers.trading import get_redis_client
+
+ENDPOINTS = {
+    "last_dates": ("/trading/last_dates", {"n": 20}),
+    "dynamics": ("/trading/dynamics", {"oil_id": "A001", "limit": 1000}),
+    "results": ("/trading/results", {}),
+    "aggregates": ("/trading/aggregates", {"granularity": "week", "oil_id": "A001", "group_by": "delivery_basis_id"}),
+}
+
+
+class MemoryRedis:
+    """Минимальная замена Redis: get/setex/set/delete_if_equal поверх словаря"""
+
+    available = True
+
+    def __init__(self, hits=True):
+        self.hits = hits
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key) if self.hits else None
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    async def set(self, key, value, nx=False, **kwargs):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete_if_equal(self, key, value):
+        if self.data.get(key) == value:
+            del self.data[key]
+
+
+async def bench(client, path, params, seconds):
+    response = await client.get(path, params=params)  # прогрев и заполнение кэша
+    response.raise_for_status()
+    requests = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        await client.get(path, params=params)
+        requests += 1
+    return requests / (time.perf_counter() - started), len(response.content)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    engine.echo = False
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    print(f"{'эндпоинт':<12}{'байт':>10}{'промах, req/s':>16}{'Redis, req/s':>15}{'память, req/s':>16}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, (path, params) in ENDPOINTS.items():
+            results = []
+            # Промах, попадание в Redis (кэш в памяти выключен) и попадание в память процесса
+            for hits, local_items in ((False, 0), (True, 0), (True, 1024)):
+                cache = TwoTierCache(LocalCache(max_items=local_items), MemoryRedis(hits))
+                app.dependency_overrides[get_redis_client] = lambda: cache
+                results.append(await bench(client, path, params, args.seconds))
+            (miss, size), (redis_hit, _), (local_hit, _) = results
+            print(f"{name:<12}{size:>10}{miss:>16.0f}{redis_hit:>15.0f}{local_hit:>16.0f}")
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
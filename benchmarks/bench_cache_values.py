@@ -0,0 +1,74 @@
+"""Размер значений кэша в Redis и время сжатия для ответов /trading.
+
+Запуск (нужна БД из DATABASE_URL с данными; zstd и lz4 - если установлены
+пакеты zstandard и lz4):
+    python benchmarks/bench_cache_values.py
+
+Ответы строятся теми же функциями, что и в эндпоинтах, поэтому размеры
+соответствуют реальным значениям кэша.
+"""
+import asyncio
+import logging
+import time
+
+from api_service import cache_codec
+from api_service.cache_codec import CacheCodec
+from api_service.database import AsyncSessionLocal, engine
+from api_service.routers import trading
+from api_service.schemas import AggregatesRequest, DynamicsRequest, ResultsRequest
+
+
+def timed(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+async def payloads():
+    fields = trading.RESPONSE_FIELDS
+    async with AsyncSessionLocal() as db:
+        return {
+            "last_dates 20": await trading.load_last_dates(db, 20),
+            "results": await trading.load_results(db, ResultsRequest()),
+            "dynamics 1000": await trading.load_dynamics_page(db, DynamicsRequest(), 1000, None, fields),
+            "dynamics 10000": await trading.load_dynamics_page(
+                db, DynamicsRequest(oil_id="A001"), 10000, None, fields
+            ),
+            "aggregates": await trading.load_aggregates(
+                db, AggregatesRequest(granularity="week"), ["delivery_basis_id", "oil_id"]
+            ),
+        }
+
+
+async def main():
+    engine.echo = False
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    values = await payloads()
+    await engine.dispose()
+
+    print(f"{'ответ':<16}{'кодек':<7}{'байт':>11}{'в Redis':>11}{'доля':>7}{'сжатие, мс':>12}{'чтение, мс':>12}")
+    for name, value in values.items():
+        print(f"{name:<16}{'-':<7}{len(value):>11}{len(value):>11}{1:>7.2f}{0:>12.2f}{0:>12.2f}")
+        for codec_name in cache_codec.available_codecs():
+            codec = CacheCodec(codec_name)
+            encoded, encode_time = timed(lambda: codec.encode(value))
+            _, decode_time = timed(lambda: codec.decode(encoded))
+            print(f"{'':<16}{codec_name:<7}{len(value):>11}{len(encoded):>11}{len(encoded) / len(value):>7.2f}"
+                  f"{encode_time * 1000:>12.2f}{decode_time * 1000:>12.2f}")
+
+    # Длина ключей: прежний формат с параметрами в строке против хэша
+    request = DynamicsRequest(oil_id="A001", delivery_basis_id="ABS", start_date="2024-01-01")
+    old_key = "dynamics_v2:" + "_".join(
+        f"{k}={v}" for k, v in {**request.model_dump(), "limit": 1000,
+                                 "fields": ",".join(trading.RESPONSE_FIELDS)}.items() if v is not None
+    )
+    new_key = trading.dynamics_key(request, 1000, None, trading.RESPONSE_FIELDS)
+    print(f"\nключ /dynamics: было {len(old_key)} байт, стало {len(new_key)} байт")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
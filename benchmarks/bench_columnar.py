@@ -0,0 +1,88 @@
+"""Размер ответа и время декодирования у клиента: JSON против Arrow IPC и Parquet.
+
+Запуск (нужен pyarrow):
+    python benchmarks/bench_columnar.py [--rows 200000]
+
+Строки генерируются в том же виде, в каком их возвращает запрос к БД в /trading/dynamics.
+"""
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import time
+from datetime import date, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from api_service import columnar
+from api_service.schemas import ParsedDataSchema
+
+FIELDS = list(ParsedDataSchema.model_fields)
+
+
+def make_rows(count):
+    start = date(2020, 1, 1)
+    rows = []
+    for i in range(count):
+        day = start + timedelta(days=i // 1000)
+        oil, basis = f"A{i % 200:03d}", f"{i // 200 % 5:03d}"
+        rows.append((
+            f"{oil}{basis}000F", f"Бензин (АИ-92-К5) {oil}", oil, basis, f"ст. Новоярославская {basis}", "F",
+            60 + i % 1000, 3_500_000 + i, i % 50 + 1, day, day, day,
+        ))
+    return rows
+
+
+def encode_json(rows):
+    # Как в /trading/dynamics: словарь на строку и даты строками
+    return json.dumps([
+        {name: value.isoformat() if isinstance(value, date) else value for name, value in zip(FIELDS, row)}
+        for row in rows
+    ]).encode()
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    rows = make_rows(args.rows)
+
+    formats = {
+        "json": (lambda: encode_json(rows), json.loads),
+        "arrow": (
+            lambda: asyncio.run(columnar.encode("arrow", columnar.build_schema(FIELDS), rows)),
+            lambda body: pa.ipc.open_stream(body).read_all(),
+        ),
+        "arrow+dict": (
+            lambda: asyncio.run(columnar.encode("arrow", columnar.build_schema(FIELDS, dictionary=True), rows)),
+            lambda body: pa.ipc.open_stream(body).read_all(),
+        ),
+        "parquet": (
+            lambda: asyncio.run(columnar.encode("parquet", columnar.build_schema(FIELDS), rows)),
+            lambda body: pq.read_table(io.BytesIO(body)),
+        ),
+    }
+
+    print(f"{args.rows} строк")
+    print(f"{'формат':<12}{'байт':>14}{'gzip, байт':>14}{'кодирование, мс':>18}{'декодирование, мс':>20}")
+    for name, (encode, decode) in formats.items():
+        body, encode_time = timed(encode)
+        _, decode_time = timed(lambda: decode(body))
+        print(f"{name:<12}{len(body):>14}{len(gzip.compress(body, 6)):>14}"
+              f"{encode_time * 1000:>18.0f}{decode_time * 1000:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Скорость разбора XLS-бюллетеней в пуле процессов.
+
+Запуск:
+    python benchmarks/bench_parse_xls.py [файлы.xls ...]
+
+Без аргументов генерирует синтетические бюллетени (нужен пакет xlwt).
+"""
+import io
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from parser_service.parser import parse_xls
+
+WORKERS = (1, 2, 4, 8)
+SYNTHETIC_FILES = 64
+SYNTHETIC_ROWS = 2000
+
+
+def make_bulletin(rows=SYNTHETIC_ROWS):
+    """Создаёт XLS со строками в формате бюллетеня spimex"""
+    import xlwt
+
+    book = xlwt.Workbook()
+    sheet = book.add_sheet("TRADE_SUMMARY")
+    sheet.write(0, 1, "Код Инструмента")
+    for i in range(rows):
+        values = ["", f"A{i % 1000:03d}NVY{i % 10}05F", "Бензин (АИ-92-К5)",
+                  "ст. Новоярославская", str(60 + i % 100), f"{3_500_000 + i}.5", str(i % 50 + 1)]
+        for col, value in enumerate(values):
+            sheet.write(i + 1, col, value)
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+
+def load_files(paths):
+    if paths:
+        files = []
+        for path in paths:
+            with open(path, "rb") as f:
+                files.append(f.read())
+        return files
+    bulletin = make_bulletin()
+    return [bulletin] * SYNTHETIC_FILES
+
+
+def bench(files, workers):
+    date = datetime(2024, 1, 1)
+    with ProcessPoolExecutor(workers) as executor:
+        # Прогрев: процессы запускаются и импортируют модули до замера
+        list(executor.map(parse_xls, files[:workers], [date] * workers))
+        started = time.perf_counter()
+        rows = sum(len(r) for r in executor.map(parse_xls, files, [date] * len(files)))
+        elapsed = time.perf_counter() - started
+    return elapsed, rows
+
+
+def main():
+    files = load_files(sys.argv[1:])
+    date = datetime(2024, 1, 1)
+
+    started = time.perf_counter()
+    for content in files:
+        parse_xls(content, date)
+    inline = time.perf_counter() - started
+    print(f"{'inline':>8}: {len(files) / inline:8.1f} файлов/с")
+
+    for workers in WORKERS:
+        elapsed, rows = bench(files, workers)
+        print(f"{workers:>8}: {len(files) / elapsed:8.1f} файлов/с ({rows / elapsed:.0f} строк/с)")
+
+
+if __name__ == "__main__":
+    main()
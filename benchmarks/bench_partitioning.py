@@ -0,0 +1,117 @@
+"""Время запросов /trading/dynamics на обычной и помесячно секционированной parsed_data.
+
+Запуск (нужна БД из DATABASE_URL, данные создаются в схемах bench_plain и bench_part):
+    python benchmarks/bench_partitioning.py [--years 6] [--rows-per-day 1000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from shared.models import DeliveryBasis, ParsedData, Product, TRADING_RESULT_VIEW_SQL
+from shared.partitioning import convert_to_partitioned
+
+SCHEMAS = ("bench_plain", "bench_part")
+START = "2019-01-01"
+
+# Формы запроса /trading/dynamics: короткий и длинный период, с фильтром по продукту и без
+QUERIES = {
+    "oil, 1 месяц": (
+        "SELECT * FROM parsed_data WHERE oil_id = 'A001' AND delivery_basis_id = '003' "
+        "AND date BETWEEN DATE '2023-03-01' AND DATE '2023-03-31'"
+    ),
+    "oil, 1 год": (
+        "SELECT * FROM parsed_data WHERE oil_id = 'A001' "
+        "AND date BETWEEN DATE '2023-01-01' AND DATE '2023-12-31'"
+    ),
+    "тип, 1 месяц": (
+        "SELECT * FROM parsed_data WHERE delivery_type_id = '1' "
+        "AND date BETWEEN DATE '2023-03-01' AND DATE '2023-03-31'"
+    ),
+    "oil, всё время": "SELECT * FROM parsed_data WHERE oil_id = 'A001' AND delivery_basis_id = '003'",
+}
+
+
+async def load_data(engine, schema, days, rows_per_day):
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+        await conn.execute(text(f"SET LOCAL search_path TO {schema}"))
+        for model in (ParsedData, Product, DeliveryBasis):
+            await conn.run_sync(lambda sync_conn, table=model.__table__: table.create(sync_conn))
+        # Представление нужно convert_to_partitioned: оно пересоздаётся поверх секционированной таблицы
+        await conn.execute(text(TRADING_RESULT_VIEW_SQL))
+        # p - номер продукта внутри дня: 200 видов нефтепродуктов x 5 базисов, 5 типов поставки
+        await conn.execute(text(f"""
+            INSERT INTO parsed_data (exchange_product_id, oil_id, delivery_basis_id, delivery_type_id,
+                                     volume, total, count, date, created_on, updated_on)
+            SELECT oil || basis || '000' || dtype, oil, basis, dtype,
+                   (p % 1000) + 60, (p % 1000) * 70000, p % 50 + 1, day, day, day
+            FROM (
+                SELECT p,
+                       'A' || lpad((p % 200)::text, 3, '0') AS oil,
+                       lpad((p / 200 % 1000)::text, 3, '0') AS basis,
+                       ((p / 7) % 5)::text AS dtype,
+                       DATE '{START}' + d AS day
+                FROM generate_series(0, {days - 1}) AS d, generate_series(0, {rows_per_day - 1}) AS p
+            ) s
+        """))
+        if schema == "bench_part":
+            await conn.run_sync(convert_to_partitioned)
+    async with engine.connect() as conn:
+        await conn.execute(text(f"SET search_path TO {schema}"))
+        await conn.execute(text("ANALYZE parsed_data"))
+        await conn.commit()
+
+
+async def measure(engine, schema, query, repeat):
+    timings = []
+    async with engine.connect() as conn:
+        await conn.execute(text(f"SET search_path TO {schema}"))
+        await conn.execute(text(query))  # прогрев кэша буферов
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = await conn.execute(text(query))
+            result.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        plan = (await conn.execute(text(f"EXPLAIN {query}"))).scalars().all()
+    partitions = {name for line in plan for name in re.findall(r"parsed_data_y\d{4}m\d{2}", line)}
+    return statistics.median(timings), len(partitions)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=6)
+    parser.add_argument("--rows-per-day", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_async_engine(os.getenv("DATABASE_URL"))
+    days = args.years * 365
+    try:
+        for schema in SCHEMAS:
+            started = time.perf_counter()
+            await load_data(engine, schema, days, args.rows_per_day)
+            print(f"{schema}: {days * args.rows_per_day} строк за {time.perf_counter() - started:.0f} с")
+
+        print(f"\n{'запрос':<16}{'обычная, мс':>14}{'секции, мс':>14}{'секций в плане':>16}")
+        for name, query in QUERIES.items():
+            plain, _ = await measure(engine, "bench_plain", query, args.repeat)
+            part, scanned = await measure(engine, "bench_part", query, args.repeat)
+            print(f"{name:<16}{plain:>14.2f}{part:>14.2f}{scanned:>16}")
+    finally:
+        async with engine.begin() as conn:
+            for schema in SCHEMAS:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
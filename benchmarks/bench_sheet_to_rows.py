@@ -0,0 +1,111 @@
+"""Сравнение построчного и поколоночного преобразования листа XLS в строки
+и подготовки строк к записи: через словари на строку и прямо из кортежей.
+
+Запуск:
+    python benchmarks/bench_sheet_to_rows.py [файл.xls]
+
+Без аргумента генерирует синтетический бюллетень (нужен пакет xlwt).
+"""
+import sys
+import timeit
+from datetime import datetime
+
+import xlrd
+
+from bench_parse_xls import make_bulletin
+from parser_service.models import UNIQUE_KEY
+from parser_service.parser import (
+    DATE_INDEX, ROW_FIELDS, STORED_FIELDS, STORED_ROW_FIELDS, row_key, sheet_to_rows, stored_values,
+)
+
+REPEAT = 50
+
+
+def rows_by_row(sheet, date):
+    """Прежний построчный разбор: row_values и проверки для каждой строки"""
+    rows = []
+    for row_num in range(sheet.nrows):
+        cols = sheet.row_values(row_num)
+        if len(cols) < 6:
+            continue
+        product_id = cols[1]
+        count = cols[-1]
+        if len(product_id) == 11 and count.isdigit():
+            rows.append((
+                product_id, cols[2], product_id[:4], product_id[4:7], cols[3], product_id[-1],
+                int(cols[4]),
+                int(cols[5]) if '.' not in cols[5] else int(cols[5].split('.')[0]),
+                int(cols[-1]),
+                date.date(),
+            ))
+    return rows
+
+
+def values_by_dict(rows, today):
+    """Прежняя подготовка VALUES: словарь на строку у вызывающего и ещё один в save_rows"""
+    data_list = [dict(zip(ROW_FIELDS, row)) for row in rows]
+    data_list = list({tuple(row[name] for name in UNIQUE_KEY.columns.keys()): row for row in data_list}.values())
+    for row in data_list:
+        row["created_on"] = today
+        row["updated_on"] = today
+    dates = {row["date"] for row in data_list}
+    return dates, [{name: value for name, value in row.items() if name in STORED_FIELDS} for row in data_list]
+
+
+def values_by_tuple(rows, today):
+    """Подготовка VALUES в save_rows: кортежи доходят до неё без словарей"""
+    rows = list({row_key(row): row for row in rows}.values())
+    dates = {row[DATE_INDEX] for row in rows}
+    return dates, [
+        dict(zip(STORED_ROW_FIELDS, stored_values(row)), created_on=today, updated_on=today) for row in rows
+    ]
+
+
+def records_by_dict(rows, today):
+    """Прежние записи COPY для backfill: словарь на строку, затем кортеж по колонкам"""
+    columns = STORED_ROW_FIELDS + ("created_on", "updated_on")
+    records = []
+    for row in (dict(zip(ROW_FIELDS, row)) for row in rows):
+        row["created_on"] = today
+        row["updated_on"] = today
+        records.append(tuple(row.get(name) for name in columns))
+    return records
+
+
+def records_by_tuple(rows, today):
+    """Записи COPY в backfill: срез кортежа разбора"""
+    return [stored_values(row) + (today, today) for row in rows]
+
+
+def measure(name, func, *args):
+    elapsed = min(timeit.repeat(lambda: func(*args), number=REPEAT, repeat=5)) / REPEAT
+    print(f"{name:>24}: {elapsed * 1000:7.3f} мс")
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            content = f.read()
+    else:
+        content = make_bulletin()
+
+    sheet = xlrd.open_workbook(file_contents=content).sheet_by_index(0)
+    date = datetime(2024, 1, 1)
+    assert rows_by_row(sheet, date) == sheet_to_rows(sheet, date)
+
+    rows = sheet_to_rows(sheet, date)
+    today = date.date()
+    assert values_by_dict(rows, today) == values_by_tuple(rows, today)
+    assert records_by_dict(rows, today) == records_by_tuple(rows, today)
+
+    print(f"Лист из {sheet.nrows} строк, {len(rows)} строк данных")
+    measure("разбор по строкам", rows_by_row, sheet, date)
+    measure("разбор по колонкам", sheet_to_rows, sheet, date)
+    measure("VALUES через словари", values_by_dict, rows, today)
+    measure("VALUES из кортежей", values_by_tuple, rows, today)
+    measure("COPY через словари", records_by_dict, rows, today)
+    measure("COPY из кортежей", records_by_tuple, rows, today)
+
+
+if __name__ == "__main__":
+    main()
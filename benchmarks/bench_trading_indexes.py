@@ -0,0 +1,119 @@
+"""Планы и время запросов /trading на синтетических данных без индексов и с индексами.
+
+Запуск (нужна БД из DATABASE_URL, данные создаются в отдельной схеме bench):
+    python benchmarks/bench_trading_indexes.py [--rows 3000000] [--rows-per-day 2000]
+"""
+import argparse
+import asyncio
+import os
+
+import asyncpg
+from dotenv import load_dotenv
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from shared.models import DeliveryBasis, ParsedData, Product, TRADING_RESULT_VIEW_SQL
+
+SCHEMA = "bench"
+
+QUERIES = {
+    "last_dates": "SELECT DISTINCT date FROM parsed_data ORDER BY date DESC LIMIT 5",
+    "results": (
+        "SELECT * FROM parsed_data_view "
+        "WHERE date = (SELECT max(date) FROM parsed_data) "
+        "AND oil_id = 'A001' AND delivery_type_id = '1'"
+    ),
+    "dynamics": (
+        "SELECT * FROM parsed_data_view "
+        "WHERE oil_id = 'A001' AND delivery_basis_id = '003' "
+        "AND date BETWEEN DATE '2024-01-01' AND DATE '2024-06-30'"
+    ),
+}
+
+
+def table_ddl():
+    """DDL таблиц из общих моделей без индексов запросов, без схемы: создаются в схеме из search_path.
+
+    Первичный ключ и ключ уникальности входят в CREATE TABLE, id получает свою
+    последовательность в схеме bench, а не общую из public.
+    """
+    dialect = postgresql.dialect()
+    return [
+        str(CreateTable(model.__table__).compile(dialect=dialect)) for model in (ParsedData, Product, DeliveryBasis)
+    ]
+
+
+def index_ddl():
+    """DDL индексов из общей модели, без схемы: создаются в схеме из search_path"""
+    dialect = postgresql.dialect()
+    return [str(CreateIndex(index).compile(dialect=dialect)) for index in ParsedData.__table__.indexes]
+
+
+async def load_data(conn, rows, rows_per_day):
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    await conn.execute(f"SET search_path TO {SCHEMA}")
+    for ddl in table_ddl():
+        await conn.execute(ddl)
+    # API читает строки с названиями из представления над parsed_data и справочниками
+    await conn.execute(TRADING_RESULT_VIEW_SQL)
+    # p - номер продукта внутри дня: 200 видов нефтепродуктов x 10 базисов, 5 типов поставки
+    await conn.execute(f"""
+        INSERT INTO parsed_data (exchange_product_id, oil_id, delivery_basis_id, delivery_type_id,
+                                 volume, total, count, date, created_on, updated_on)
+        SELECT oil || basis || '000' || dtype, oil, basis, dtype,
+               (g % 1000) + 60, (g % 1000) * 70000, g % 50 + 1, day, day, day
+        FROM (
+            SELECT g,
+                   'A' || lpad(((g % {rows_per_day}) % 200)::text, 3, '0') AS oil,
+                   lpad(((g % {rows_per_day}) / 200 % 1000)::text, 3, '0') AS basis,
+                   (((g % {rows_per_day}) / 7) % 5)::text AS dtype,
+                   DATE '2020-01-01' + (g / {rows_per_day})::int AS day
+            FROM generate_series(0, {rows - 1}) AS g
+        ) s
+    """)
+    await conn.execute("""
+        INSERT INTO products (exchange_product_id, exchange_product_name, last_seen_date)
+        SELECT exchange_product_id, 'Продукт ' || min(oil_id), max(date) FROM parsed_data GROUP BY 1
+    """)
+    await conn.execute("""
+        INSERT INTO delivery_bases (delivery_basis_id, delivery_basis_name, last_seen_date)
+        SELECT delivery_basis_id, 'Базис ' || delivery_basis_id, max(date) FROM parsed_data GROUP BY 1
+    """)
+    await conn.execute("ANALYZE parsed_data, products, delivery_bases")
+
+
+async def explain_all(conn, title):
+    print(f"\n===== {title} =====")
+    for name, query in QUERIES.items():
+        plan = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}")
+        print(f"\n--- {name}: {query}")
+        for row in plan:
+            print(row[0])
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--rows-per-day", type=int, default=2000)
+    args = parser.parse_args()
+
+    load_dotenv()
+    dsn = os.getenv("DATABASE_URL").replace("postgresql+asyncpg://", "postgresql://")
+    conn = await asyncpg.connect(dsn)
+    try:
+        print(f"Загружаем {args.rows} строк в {SCHEMA}.parsed_data ...")
+        await load_data(conn, args.rows, args.rows_per_day)
+        await explain_all(conn, "Без индексов запросов")
+
+        for ddl in index_ddl():
+            await conn.execute(ddl)
+        await conn.execute("ANALYZE parsed_data")
+        await explain_all(conn, "С индексами из миграций")
+    finally:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
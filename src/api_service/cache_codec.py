@@ -0,0 +1,94 @@
+"""Сжатие значений кэша в Redis.
+
+Первый байт значения - метка кодека, дальше данные. Значения меньше
+CACHE_COMPRESS_MIN_BYTES хранятся как есть: сжатие коротких ответов не окупается.
+Для zstd и lz4 нужны пакеты zstandard и lz4 (pip install -e .[cache]), без них
+используется zlib из стандартной библиотеки.
+"""
+import os
+import zlib
+
+from dotenv import load_dotenv
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - зависит от окружения
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - зависит от окружения
+    lz4_frame = None
+
+load_dotenv()
+
+# Значения короче этого размера, байты, не сжимаются
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+# Кодек сжатия: zstd, lz4 или zlib; по умолчанию лучший из установленных
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION")
+CACHE_COMPRESSION_LEVEL = 3
+
+RAW = b"\x00"
+CODEC_TAGS = {"zlib": b"z", "zstd": b"Z", "lz4": b"L"}
+
+
+def available_codecs():
+    codecs = []
+    if zstandard is not None:
+        codecs.append("zstd")
+    if lz4_frame is not None:
+        codecs.append("lz4")
+    codecs.append("zlib")
+    return codecs
+
+
+def default_codec():
+    if CACHE_COMPRESSION in available_codecs():
+        return CACHE_COMPRESSION
+    return available_codecs()[0]
+
+
+def compress(codec, data, level=CACHE_COMPRESSION_LEVEL):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if codec == "lz4":
+        return lz4_frame.compress(data)
+    return zlib.compress(data, level)
+
+
+def decompress(codec, data):
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "lz4":
+        return lz4_frame.decompress(data)
+    return zlib.decompress(data)
+
+
+class CacheCodec:
+    """Кодирует значения перед записью в Redis и декодирует после чтения"""
+
+    def __init__(self, codec=None, min_bytes=CACHE_COMPRESS_MIN_BYTES):
+        self.codec = codec or default_codec()
+        self.min_bytes = min_bytes
+        self.tags = {tag: name for name, tag in CODEC_TAGS.items()}
+
+    def encode(self, value):
+        if len(value) < self.min_bytes:
+            return RAW + value
+        return CODEC_TAGS[self.codec] + compress(self.codec, value)
+
+    def decode(self, value):
+        """Исходные байты; None, если значение нельзя прочитать в этом процессе"""
+        if not value:
+            return None
+        tag, data = value[:1], value[1:]
+        if tag == RAW:
+            return data
+        codec = self.tags.get(tag)
+        # Значение сжато кодеком, который здесь не установлен: считаем промахом
+        if codec is None or codec not in available_codecs():
+            return None
+        try:
+            return decompress(codec, data)
+        except Exception:
+            return None
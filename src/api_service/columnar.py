@@ -0,0 +1,127 @@
+"""Ответы в колоночных форматах Apache Arrow IPC и Parquet.
+
+Нужен пакет pyarrow (pip install -e .[arrow]). Без него эндпоинты отвечают
+только JSON, а запрос Arrow/Parquet получает 406.
+"""
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - зависит от окружения
+    pa = pq = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+MEDIA_TYPES = {
+    "arrow": ARROW_STREAM,
+    "parquet": PARQUET,
+}
+
+# Строковые колонки с небольшим числом различных значений
+DICTIONARY_FIELDS = ("exchange_product_name", "delivery_basis_name")
+
+INT_FIELDS = ("volume", "total", "count")
+DATE_FIELDS = ("date", "created_on", "updated_on")
+
+
+def available():
+    return pa is not None
+
+
+def negotiate(accept):
+    """Выбирает колоночный формат по заголовку Accept, None - отвечать JSON"""
+    if not accept:
+        return None
+    for part in accept.split(","):
+        media_type = part.split(";")[0].strip().lower()
+        for fmt, columnar_type in MEDIA_TYPES.items():
+            if media_type == columnar_type:
+                return fmt
+    return None
+
+
+def build_schema(fields, dictionary=False):
+    """Схема Arrow для выбранных полей parsed_data"""
+    columns = []
+    for name in fields:
+        if name in INT_FIELDS:
+            arrow_type = pa.int64()
+        elif name in DATE_FIELDS:
+            arrow_type = pa.date32()
+        elif dictionary and name in DICTIONARY_FIELDS:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        else:
+            arrow_type = pa.string()
+        columns.append(pa.field(name, arrow_type))
+    return pa.schema(columns)
+
+
+def record_batch(schema, rows):
+    """Собирает RecordBatch из пачки строк результата запроса, минуя dict и Pydantic"""
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файл только для записи, из которого можно забирать записанное по частям.
+
+    tell() считает все записанные байты: по нему ParquetWriter вычисляет смещения.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+async def encode_stream(fmt, schema, batches):
+    """Кодирует пачки строк в поток Arrow IPC или Parquet по мере поступления.
+
+    В Parquet каждая пачка становится отдельной группой строк, метаданные
+    файла пишутся в конце.
+    """
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    async for rows in batches:
+        if rows:
+            writer.write_batch(record_batch(schema, rows))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    writer.close()
+    yield sink.drain()
+
+
+async def encode(fmt, schema, rows):
+    """Кодирует одну пачку строк целиком"""
+    async def single():
+        yield rows
+
+    return b"".join([chunk async for chunk in encode_stream(fmt, schema, single())])
@@ -1,23 +1,31 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
-from typing import AsyncGenerator
-from dotenv import load_dotenv
 import os
+from typing import AsyncGenerator
 
-load_dotenv()
+from sqlalchemy.ext.asyncio import AsyncSession
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+from shared.database import (  # noqa: F401
+    Base, DATABASE_REPLICA_URL, DATABASE_URL, create_engine, create_sessionmaker,
+)
 
-# Создаем асинхронный движок
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Основная БД: запись и прогрев кэша после загрузки
+engine = create_engine()
+AsyncSessionLocal = create_sessionmaker(engine)
+
+# Реплика для чтения; без DATABASE_REPLICA_URL - та же основная БД
+read_engine = create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else engine
+ReadSessionLocal = create_sessionmaker(read_engine) if DATABASE_REPLICA_URL else AsyncSessionLocal
+
+# Сколько секунд после смены версии кэша промахи читают основную БД:
+# реплика могла ещё не получить только что загруженные торги
+DB_REPLICA_GRACE_PERIOD = float(os.getenv("DB_REPLICA_GRACE_PERIOD", "60"))
 
-# Фабрика сессий
-AsyncSessionLocal = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
-        
-Base = declarative_base()
\ No newline at end of file
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для эндпоинтов, которые только читают данные"""
+    async with ReadSessionLocal() as session:
+        yield session
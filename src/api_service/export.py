@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def encode_ndjson(fields, rows, header=False):
+    """Кодирует пачку строк в NDJSON, по объекту на строку"""
+    return "".join(
+        json.dumps({name: _json_value(value) for name, value in zip(fields, row)}, ensure_ascii=False) + "\n"
+        for row in rows
+    ).encode()
+
+
+def encode_csv(fields, rows, header=False):
+    """Кодирует пачку строк в CSV, header=True добавляет строку заголовков"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+ENCODERS = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
+
+
+async def encode_rows(fmt, fields, batches):
+    """Кодирует пачки строк в NDJSON или CSV по мере их поступления"""
+    encode = ENCODERS[fmt]
+    header = True
+    async for rows in batches:
+        yield encode(fields, rows, header=header)
+        header = False
+    if header:
+        # Пустая выгрузка: в CSV всё равно отдаём заголовки
+        yield encode(fields, [], header=True)
+
+
+async def gzip_stream(chunks):
+    """Сжимает поток в gzip.
+
+    Каждая часть сжимается с Z_SYNC_FLUSH, чтобы клиент получал данные сразу,
+    а не после заполнения буфера компрессора.
+    """
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
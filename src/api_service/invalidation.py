@@ -0,0 +1,101 @@
+"""Сброс и прогрев кэша API по событию о загрузке торгов.
+
+Каждый процесс API слушает канал Postgres INGEST_CHANNEL. Получив уведомление,
+процесс переключает кэш на версию из уведомления, а один из процессов (кто
+первым взял блокировку в Redis) заново заполняет кэш частыми запросами.
+"""
+import asyncio
+import logging
+import os
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from api_service.database import DATABASE_URL
+from shared.events import INGEST_CHANNEL, parse_ingest_payload
+
+logger = logging.getLogger(__name__)
+
+# Пауза после уведомления: загрузка нескольких дат подряд сбрасывает кэш один раз
+CACHE_INVALIDATION_DELAY = float(os.getenv("CACHE_INVALIDATION_DELAY", "1"))
+# Как часто проверять соединение LISTEN и через сколько переподключаться после ошибки, секунды
+LISTEN_CHECK_INTERVAL = float(os.getenv("CACHE_LISTEN_CHECK_INTERVAL", "30"))
+LISTEN_RECONNECT_INTERVAL = float(os.getenv("CACHE_LISTEN_RECONNECT_INTERVAL", "5"))
+# Блокировка прогрева одной версии, секунды
+WARM_LOCK_TTL = 60
+
+
+def listen_dsn(url=DATABASE_URL):
+    """DSN для asyncpg из URL SQLAlchemy: без имени драйвера"""
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class CacheInvalidator:
+    """Слушает уведомления о загрузке и переключает версию кэша"""
+
+    def __init__(self, cache, warm, dsn=None, delay=CACHE_INVALIDATION_DELAY):
+        self.cache = cache
+        self.warm = warm
+        self.dsn = dsn
+        self.delay = delay
+        self.pending = None
+        self.listen_task = None
+        self.apply_task = None
+
+    def start(self):
+        self.listen_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        tasks = [task for task in (self.listen_task, self.apply_task) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _listen(self):
+        dsn = self.dsn or listen_dsn()
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+            except (OSError, asyncpg.PostgresError) as error:
+                logger.warning("Не удалось подписаться на %s: %s", INGEST_CHANNEL, error)
+                await asyncio.sleep(LISTEN_RECONNECT_INTERVAL)
+                continue
+            try:
+                await conn.add_listener(INGEST_CHANNEL, self.on_notify)
+                # Запрос раз в LISTEN_CHECK_INTERVAL замечает оборванное соединение
+                while True:
+                    await asyncio.sleep(LISTEN_CHECK_INTERVAL)
+                    await conn.fetchval("SELECT 1", timeout=LISTEN_CHECK_INTERVAL)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as error:
+                logger.warning("Соединение LISTEN %s потеряно: %s", INGEST_CHANNEL, error)
+            finally:
+                conn.terminate()
+            await asyncio.sleep(LISTEN_RECONNECT_INTERVAL)
+
+    def on_notify(self, conn, pid, channel, payload):
+        try:
+            version, start, end = parse_ingest_payload(payload)
+        except (ValueError, KeyError) as error:
+            logger.warning("Некорректное уведомление %s: %s", channel, error)
+            return
+        logger.info("Загружены торги за %s - %s, новая версия кэша %s", start, end, version)
+        self.pending = version
+        if self.apply_task is None or self.apply_task.done():
+            self.apply_task = asyncio.create_task(self.apply())
+
+    async def apply(self):
+        """Переключает версию и прогревает кэш, пока приходят новые уведомления"""
+        while True:
+            await asyncio.sleep(self.delay)
+            version = self.pending
+            await self.cache.set_version(version)
+
+            # Прогревает один процесс; без Redis каждый прогревает свой кэш в памяти
+            redis = self.cache.redis
+            locked = await redis.set(f"cache:warm:{version}", b"1", nx=True, ex=WARM_LOCK_TTL)
+            if locked or not redis.available:
+                warmed = await self.warm(self.cache)
+                logger.info("Кэш версии %s прогрет: %s запросов", version, warmed)
+
+            if self.pending == version:
+                return
@@ -0,0 +1,189 @@
+"""Кэш в памяти процесса API перед Redis.
+
+Горячие ответы отдаются из памяти воркера без обращения к Redis. Размер кэша
+ограничен числом записей и суммарным объёмом значений на процесс, вытесняются
+давно не запрошенные записи.
+"""
+import os
+import secrets
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from api_service.cache_codec import CacheCodec
+from api_service.redis_cache import get_redis_ttl
+
+load_dotenv()
+
+# Ограничения на один процесс API: у каждого воркера свой кэш
+LOCAL_CACHE_MAX_ITEMS = int(os.getenv("LOCAL_CACHE_MAX_ITEMS", "1024"))
+LOCAL_CACHE_MAX_BYTES = int(os.getenv("LOCAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Сколько секунд запись живёт в памяти: ограничивает расхождение между воркерами
+LOCAL_CACHE_TTL = float(os.getenv("LOCAL_CACHE_TTL", "60"))
+
+
+class LocalCache:
+    """LRU-кэш байтовых значений с TTL и ограничением по памяти"""
+
+    def __init__(self, max_items=LOCAL_CACHE_MAX_ITEMS, max_bytes=LOCAL_CACHE_MAX_BYTES, ttl=LOCAL_CACHE_TTL):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        if key in self.entries:
+            self._remove(key)
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        size = len(value)
+        # Значение больше всего кэша не кладём: оно вытеснило бы все остальные
+        if ttl <= 0 or size > self.max_bytes or self.max_items <= 0:
+            return
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.size += size
+        while len(self.entries) > self.max_items or self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def _remove(self, key):
+        _, value = self.entries.pop(key)
+        self.size -= len(value)
+
+    def stats(self):
+        return {
+            "items": len(self.entries),
+            "bytes": self.size,
+            "max_items": self.max_items,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Ключ Redis с текущей версией кэша для процессов, запущенных после загрузки
+VERSION_KEY = "cache:version"
+
+
+class TwoTierCache:
+    """Кэш из двух уровней: память процесса, затем Redis.
+
+    Интерфейс get/setex тот же, что у клиента Redis, поэтому эндпоинты
+    работают с ним как с Redis. Ключи хранятся с префиксом версии: после
+    загрузки новых данных версия меняется, и старые записи больше не читаются,
+    пока не истечёт их TTL. В Redis значения хранятся сжатыми, в памяти процесса -
+    готовыми к отдаче.
+    """
+
+    def __init__(self, local, redis, codec=None):
+        self.local = local
+        self.redis = redis
+        self.codec = codec or CacheCodec()
+        self.version = "0"
+        self.previous_version = None
+        self.switched_at = None
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    def _key(self, key, version=None):
+        return f"{version or self.version}:{key}"
+
+    async def load_version(self):
+        """Берёт текущую версию из Redis при запуске процесса"""
+        version = await self.redis.get(VERSION_KEY)
+        if version:
+            self.version = version.decode() if isinstance(version, bytes) else version
+        return self.version
+
+    async def set_version(self, version):
+        """Переключает кэш на новую версию, записи в памяти процесса сбрасываются"""
+        if version != self.version:
+            self.previous_version = self.version
+            self.switched_at = time.monotonic()
+        self.version = version
+        self.local.clear()
+        await self.redis.set(VERSION_KEY, version)
+
+    def since_switch(self):
+        """Секунд с последней смены версии в этом процессе; None, если версия не менялась"""
+        if self.switched_at is None:
+            return None
+        return time.monotonic() - self.switched_at
+
+    async def get(self, key):
+        key = self._key(key)
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = self.codec.decode(await self.redis.get(key))
+        if value is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        # В памяти запись не переживает суточную границу обновления данных
+        self.local.set(key, value, get_redis_ttl())
+        return value
+
+    async def setex(self, key, ttl, value, version=None):
+        """Записывает значение под версией, с которой началась его загрузка.
+
+        Если за время загрузки версия сменилась, значение уходит только в Redis
+        под старой версией: там оно пригодится как устаревший ответ (get_stale),
+        а новую версию не займёт.
+        """
+        version = version or self.version
+        if version == self.version:
+            self.local.set(self._key(key), value, ttl)
+        await self.redis.setex(self._key(key, version), ttl, self.codec.encode(value))
+
+    async def get_stale(self, key):
+        """Значение предыдущей версии: отдаётся, пока другой процесс загружает новое"""
+        if self.previous_version is None:
+            return None
+        return self.codec.decode(await self.redis.get(f"{self.previous_version}:{key}"))
+
+    async def lock(self, key, ttl, version=None):
+        """Берёт блокировку загрузки ключа.
+
+        Возвращает случайный токен владельца или None, если ключ загружает другой
+        процесс. Без Redis загружает каждый процесс.
+        """
+        token = secrets.token_hex(16).encode()
+        locked = await self.redis.set(f"lock:{self._key(key, version)}", token, nx=True, px=int(ttl * 1000))
+        if locked or not self.redis.available:
+            return token
+        return None
+
+    async def unlock(self, key, token, version=None):
+        """Снимает блокировку, если она всё ещё наша: после истечения TTL её мог взять другой процесс"""
+        await self.redis.delete_if_equal(f"lock:{self._key(key, version)}", token)
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "local": self.local.stats(),
+            "redis": {"hits": self.redis_hits, "misses": self.redis_misses},
+        }
@@ -1,11 +1,38 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from api_service.routers.trading import router as trading_router
+from api_service.invalidation import CacheInvalidator
+from api_service.local_cache import LocalCache, TwoTierCache
+from api_service.redis_cache import create_redis
+from api_service.routers.trading import router as trading_router, warm_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Один клиент Redis с пулом соединений на всё время работы процесса
+    app.state.redis = create_redis()
+    # Перед Redis - кэш в памяти процесса
+    app.state.cache = TwoTierCache(LocalCache(), app.state.redis)
+    await app.state.cache.load_version()
+    # Сброс и прогрев кэша после каждой загрузки торгов парсером
+    app.state.invalidator = CacheInvalidator(app.state.cache, warm_cache)
+    app.state.invalidator.start()
+    yield
+    await app.state.invalidator.stop()
+    await app.state.redis.close()
 
-app = FastAPI(title="Spimex Trading Results API")
+
+app = FastAPI(title="Spimex Trading Results API", lifespan=lifespan)
 
 # Подключаем маршруты
 app.include_router(trading_router)
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to Spimex Trading API"}
\ No newline at end of file
+    return {"message": "Welcome to Spimex Trading API"}
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Попадания и промахи кэша текущего процесса API"""
+    return app.state.cache.stats()
@@ -1,7 +1,36 @@
-from redis import asyncio as aioredis
+import logging
+import os
+import time
 from datetime import datetime, timedelta
 
-REDIS_URL = "redis://redis"
+from dotenv import load_dotenv
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis")
+# Размер пула соединений на процесс API и время ожидания свободного соединения, секунды
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "0.2"))
+# Таймауты подключения и операций: медленный Redis не должен задерживать ответ из БД
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+# Сколько секунд после ошибки не обращаться к Redis и работать только с БД
+REDIS_RETRY_INTERVAL = float(os.getenv("REDIS_RETRY_INTERVAL", "5"))
+
+
+# Сравнение и удаление одной командой: между GET и DEL ключ не успеет смениться
+DELETE_IF_EQUAL_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
 
 def get_redis_ttl():
     now = datetime.now()
@@ -10,5 +39,78 @@ def get_redis_ttl():
         target_time += timedelta(days=1)
     return int((target_time - now).total_seconds())
 
-async def get_redis():
-    return await aioredis.from_url(REDIS_URL, decode_responses=True)
\ No newline at end of file
+
+class SafeRedis:
+    """Обёртка над клиентом Redis, которая не роняет запрос при недоступном Redis.
+
+    Ошибка Redis превращается в промах кэша, после чего REDIS_RETRY_INTERVAL секунд
+    запросы идут сразу в БД, не тратя время на таймауты.
+    """
+
+    def __init__(self, client, retry_interval=REDIS_RETRY_INTERVAL):
+        self.client = client
+        self.retry_interval = retry_interval
+        self.disabled_until = 0.0
+
+    @property
+    def available(self):
+        return time.monotonic() >= self.disabled_until
+
+    def _on_error(self, error):
+        if self.available:
+            logger.warning("Redis недоступен, ответы идут из БД: %s", error)
+        self.disabled_until = time.monotonic() + self.retry_interval
+
+    async def get(self, key):
+        if not self.available:
+            return None
+        try:
+            return await self.client.get(key)
+        except (RedisError, OSError) as error:
+            self._on_error(error)
+            return None
+
+    async def setex(self, key, ttl, value):
+        if not self.available:
+            return
+        try:
+            await self.client.setex(key, ttl, value)
+        except (RedisError, OSError) as error:
+            self._on_error(error)
+
+    async def set(self, key, value, **kwargs):
+        if not self.available:
+            return None
+        try:
+            return await self.client.set(key, value, **kwargs)
+        except (RedisError, OSError) as error:
+            self._on_error(error)
+            return None
+
+    async def delete_if_equal(self, key, value):
+        """Удаляет ключ, только если в нём всё ещё value: чужая блокировка не снимается"""
+        if not self.available:
+            return 0
+        try:
+            return await self.client.eval(DELETE_IF_EQUAL_SCRIPT, 1, key, value)
+        except (RedisError, OSError) as error:
+            self._on_error(error)
+            return 0
+
+    async def close(self):
+        await self.client.connection_pool.disconnect()
+
+
+def create_redis(url=REDIS_URL):
+    """Создаёт клиент Redis с общим пулом соединений на всё время работы API"""
+    pool = aioredis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        # Ответы хранятся готовыми байтами JSON и отдаются без декодирования
+        decode_responses=False,
+    )
+    return SafeRedis(aioredis.Redis(connection_pool=pool))
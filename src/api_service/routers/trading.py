@@ -1,141 +1,443 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import BigInteger, Date, DateTime, func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Any
+from typing import List, Any, Optional
+from datetime import date
 
-from api_service.models import ParsedData
-from api_service.schemas import LastDatesResponse, ParsedDataSchema, DynamicsRequest, ResultsRequest
-from api_service.database import get_db
-from api_service.redis_cache import get_redis, get_redis_ttl
+from api_service.models import DailyAggregate, TradingDate, TradingResult
+from api_service.schemas import (
+    AggregateSchema, AggregatesRequest, DynamicsField, ExportFormat, GroupField, LastDatesResponse,
+    ParsedDataSchema, DynamicsRequest, DynamicsRowSchema, ResultsRequest,
+)
+from api_service.database import (
+    AsyncSessionLocal, DATABASE_REPLICA_URL, DB_REPLICA_GRACE_PERIOD, ReadSessionLocal, get_read_db,
+)
+from api_service import columnar
+from api_service.export import MEDIA_TYPES, encode_rows, gzip_stream
+from api_service.redis_cache import get_redis_ttl
+from api_service.single_flight import load_once
+from collections import Counter
+import base64
+import hashlib
 import json
+import logging
+import os
+import orjson
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/trading", tags=["Trading Results"])
 
 
-# Зависимость для получения Redis-клиента
-async def get_redis_client():
-    return await get_redis()
+# Зависимость для получения кэша, созданного при запуске приложения:
+# память процесса, затем Redis
+def get_redis_client(request: Request):
+    return request.app.state.cache
+
+
+# Версия формата ключей и значений кэша: повышается при изменении ответов эндпоинтов
+CACHE_SCHEMA_VERSION = 1
 
 
-# Вспомогательная функция для генерации ключей кэша
 def generate_cache_key(prefix: str, **kwargs) -> str:
-    params = "_".join([f"{k}={v}" for k, v in kwargs.items() if v is not None])
-    return f"{prefix}:{params}"
+    """Ключ кэша: эндпоинт и хэш нормализованных параметров.
+
+    Параметры сортируются по имени, пустые отбрасываются, поэтому равнозначные
+    запросы получают один ключ независимо от порядка и записи параметров.
+    """
+    params = {name: value for name, value in kwargs.items() if value not in (None, "", [])}
+    canonical = json.dumps(params, sort_keys=True, default=str, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+    return f"v{CACHE_SCHEMA_VERSION}:{prefix}:{digest}"
+
+
+def last_dates_key(n) -> str:
+    return generate_cache_key("last_dates", n=n)
+
+
+def results_key(request) -> str:
+    return generate_cache_key("results", **request.model_dump())
+
+
+def dynamics_key(request, limit, cursor, fields) -> str:
+    return generate_cache_key("dynamics", **request.model_dump(), limit=limit, cursor=cursor, fields=fields)
+
+
+def json_response(body, headers=None) -> Response:
+    """Отдаёт готовый JSON как есть, без повторной валидации и сериализации"""
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def pack_page(next_cursor, body) -> bytes:
+    """Значение кэша страницы /dynamics: курсор следующей страницы и тело ответа"""
+    return (next_cursor or "").encode() + b"\n" + body
+
+
+def unpack_page(value):
+    if isinstance(value, str):
+        value = value.encode()
+    next_cursor, _, body = value.partition(b"\n")
+    return next_cursor.decode() or None, body
+
+
+# Колонки ответов /dynamics и /results в порядке полей схемы
+RESPONSE_FIELDS = list(ParsedDataSchema.model_fields)
+
+
+def apply_filters(query, model, request):
+    """Добавляет к запросу фильтры из параметров эндпоинта"""
+    for name in ("oil_id", "delivery_type_id", "delivery_basis_id"):
+        value = getattr(request, name)
+        if value:
+            query = query.where(getattr(model, name) == value)
+    if getattr(request, "start_date", None):
+        query = query.where(model.date >= request.start_date)
+    if getattr(request, "end_date", None):
+        query = query.where(model.date <= request.end_date)
+    return query
+
+
+# Размер страницы /dynamics по умолчанию и максимальный
+DYNAMICS_PAGE_SIZE = 1000
+DYNAMICS_MAX_PAGE_SIZE = 10000
+
+# Строк в одной пачке серверного курсора /export
+EXPORT_BATCH_SIZE = 5000
+
+
+def encode_cursor(day, row_id) -> str:
+    """Курсор следующей страницы: ключ (date, id) последней отданной строки"""
+    return base64.urlsafe_b64encode(json.dumps([day.isoformat(), row_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        day, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(day), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный cursor")
+
+
+def columnar_format(fmt):
+    """Проверяет, что колоночный формат можно отдать в этом окружении"""
+    if fmt and not columnar.available():
+        raise HTTPException(status_code=406, detail="Форматы Arrow и Parquet недоступны: не установлен pyarrow")
+    return fmt
+
+
+# Сколько популярных запросов прогревать после загрузки и сколько запросов помнить
+CACHE_WARM_QUERIES = int(os.getenv("CACHE_WARM_QUERIES", "20"))
+POPULAR_QUERIES_LIMIT = 10000
+
+# Запросы, которые прогреваются всегда: значения по умолчанию эндпоинтов
+DEFAULT_WARM_QUERIES = [
+    ("last_dates", {"n": 5}),
+    ("results", ResultsRequest().model_dump()),
+    ("dynamics", {
+        **DynamicsRequest().model_dump(mode="json"), "limit": DYNAMICS_PAGE_SIZE, "fields": RESPONSE_FIELDS,
+    }),
+]
+
+# Счётчик запросов этого процесса: по нему выбираются запросы для прогрева
+popular_queries = Counter()
+
+
+def track_query(endpoint, **params):
+    if len(popular_queries) >= POPULAR_QUERIES_LIMIT:
+        # Оставляем самые частые, чтобы счётчик не рос без ограничений
+        kept = popular_queries.most_common(POPULAR_QUERIES_LIMIT // 10)
+        popular_queries.clear()
+        popular_queries.update(dict(kept))
+    popular_queries[(endpoint, json.dumps(params, sort_keys=True, default=str))] += 1
+
+
+def warm_queries(top=CACHE_WARM_QUERIES):
+    """Запросы для прогрева: значения по умолчанию и самые частые запросы процесса"""
+    queries = [(endpoint, json.dumps(params, sort_keys=True)) for endpoint, params in DEFAULT_WARM_QUERIES]
+    for query, _ in popular_queries.most_common(top):
+        if query not in queries:
+            queries.append(query)
+    return [(endpoint, json.loads(params)) for endpoint, params in queries]
+
+
+# Ответы в колоночных форматах для документации OpenAPI
+COLUMNAR_RESPONSES = {200: {"content": {media_type: {} for media_type in columnar.MEDIA_TYPES.values()}}}
+
+
+def fill_sessionmaker(cache):
+    """Сессии для заполнения кэша.
+
+    Первые DB_REPLICA_GRACE_PERIOD секунд после смены версии промахи читают
+    основную БД: реплика могла ещё не получить загруженные торги, а значение
+    осталось бы в новой версии кэша до суточного TTL.
+    """
+    if DATABASE_REPLICA_URL:
+        since_switch = cache.since_switch()
+        if since_switch is not None and since_switch < DB_REPLICA_GRACE_PERIOD:
+            return AsyncSessionLocal
+    return ReadSessionLocal
+
+
+def in_session(cache, load):
+    """Загрузка для load_once в собственной сессии.
+
+    Одну загрузку ждут все совпавшие промахи, поэтому сессия запроса не подходит:
+    при отключении клиента FastAPI закроет её посреди загрузки.
+    """
+    async def run():
+        async with fill_sessionmaker(cache)() as db:
+            return await load(db)
+    return run
+
+
+async def load_last_dates(db, n) -> bytes:
+    # Запрос к справочнику торговых дат
+    result = await db.execute(
+        select(TradingDate.date)
+        .order_by(TradingDate.date.desc())
+        .limit(n)
+    )
+    return orjson.dumps({"dates": [row[0] for row in result.all()]})
 
 
 @router.get("/last_dates", response_model=LastDatesResponse)
 async def get_last_trading_dates(
     n: int = Query(5, ge=1),
-    db: AsyncSession = Depends(get_db),
     redis: Any = Depends(get_redis_client)
 ):
     """
     Возвращает список последних торговых дат.
     """
-    cache_key = f"last_dates:{n}"
-    cached = await redis.get(cache_key)
+    track_query("last_dates", n=n)
+    body = await load_once(redis, last_dates_key(n), in_session(redis, lambda db: load_last_dates(db, n)))
+    return json_response(body)
 
-    if cached:
-        return json.loads(cached)
 
-    # Запрос к БД
-    result = await db.execute(
-        select(ParsedData.date)
-        .distinct()
-        .order_by(ParsedData.date.desc())
-        .limit(n)
-    )
-    rows = result.all()
-    dates = [row[0].isoformat() for row in rows]
+def dynamics_query(request, limit, after, fields):
+    # Выбираем только запрошенные колонки и ключ курсора
+    columns = [getattr(TradingResult, name) for name in fields if name != "date"]
+    query = apply_filters(select(TradingResult.date, TradingResult.id, *columns), TradingResult, request)
+    if after:
+        query = query.where(tuple_(TradingResult.date, TradingResult.id) > after)
 
-    response = {"dates": dates}
-    await redis.setex(cache_key, get_redis_ttl(), json.dumps(response))
-    return response
+    # Лишняя строка показывает, есть ли следующая страница
+    return query.order_by(TradingResult.date, TradingResult.id).limit(limit + 1)
+
+
+async def load_dynamics_page(db, request, limit, after, fields) -> bytes:
+    """Страница /dynamics в формате значения кэша, см. pack_page"""
+    result = await db.execute(dynamics_query(request, limit, after, fields))
+    rows = result.all()
+    next_cursor = encode_cursor(rows[limit - 1].date, rows[limit - 1].id) if len(rows) > limit else None
+    body = orjson.dumps([{name: row._mapping[name] for name in fields} for row in rows[:limit]])
+    return pack_page(next_cursor, body)
 
 
-@router.get("/dynamics", response_model=List[ParsedDataSchema])
+@router.get("/dynamics", response_model=List[DynamicsRowSchema], response_model_exclude_unset=True,
+            responses=COLUMNAR_RESPONSES)
 async def get_dynamics(
+    http_request: Request,
     request: DynamicsRequest = Depends(),
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(DYNAMICS_PAGE_SIZE, ge=1, le=DYNAMICS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: List[DynamicsField] = Query([]),
+    dictionary: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db),
     redis: Any = Depends(get_redis_client)
 ):
     """
     Возвращает данные о торгах за определённый период с фильтрами.
+
+    Строки отдаются страницами по limit в порядке (date, id). Если есть следующая
+    страница, её курсор передаётся в заголовке X-Next-Cursor. fields= ограничивает
+    набор полей в ответе.
+
+    С Accept: application/vnd.apache.arrow.stream или application/vnd.apache.parquet
+    страница отдаётся в колоночном формате мимо кэша, dictionary=true кодирует
+    названия продукта и базиса словарём.
     """
-    cache_key = generate_cache_key("dynamics", **request.model_dump())
-    cached = await redis.get(cache_key)
-
-    if cached:
-        return json.loads(cached)
-
-    # Формируем запрос
-    query = select(ParsedData)
-
-    if request.oil_id:
-        query = query.where(ParsedData.oil_id == request.oil_id)
-    if request.delivery_type_id:
-        query = query.where(ParsedData.delivery_type_id ==
-                            request.delivery_type_id)
-    if request.delivery_basis_id:
-        query = query.where(ParsedData.delivery_basis_id ==
-                            request.delivery_basis_id)
-    if request.start_date:
-        query = query.where(ParsedData.date >= request.start_date)
-    if request.end_date:
-        query = query.where(ParsedData.date <= request.end_date)
+    fields = [name for name in RESPONSE_FIELDS if name in fields] or RESPONSE_FIELDS
+    after = decode_cursor(cursor) if cursor else None
+    fmt = columnar_format(columnar.negotiate(http_request.headers.get("accept")))
+
+    if fmt:
+        result = await db.execute(dynamics_query(request, limit, after, fields))
+        rows = result.all()
+        body = await columnar.encode(
+            fmt,
+            columnar.build_schema(fields, dictionary),
+            [tuple(row._mapping[name] for name in fields) for row in rows[:limit]],
+        )
+        headers = {}
+        if len(rows) > limit:
+            headers["X-Next-Cursor"] = encode_cursor(rows[limit - 1].date, rows[limit - 1].id)
+        return Response(content=body, media_type=columnar.MEDIA_TYPES[fmt], headers=headers)
+
+    if not cursor:
+        track_query("dynamics", **request.model_dump(mode="json"), limit=limit, fields=fields)
+    next_cursor, body = unpack_page(await load_once(
+        redis,
+        dynamics_key(request, limit, cursor, fields),
+        in_session(redis, lambda db: load_dynamics_page(db, request, limit, after, fields)),
+    ))
+    return json_response(body, {"X-Next-Cursor": next_cursor} if next_cursor else None)
 
-    result = await db.execute(query)
-    rows = result.all()
-    data = [item.to_dict() for item, in rows]
 
-    await redis.setex(cache_key, get_redis_ttl(), json.dumps(data))
-    return data
+async def load_results(db, request) -> bytes:
+    # Получаем последнюю дату торгов из справочника
+    last_date_query = select(func.max(TradingDate.date))
+    last_date_result = await db.execute(last_date_query)
+    last_date = last_date_result.scalar_one_or_none()
+
+    if not last_date:
+        return b"[]"
+
+    # Формируем запрос с фильтром по последней дате: только колонки ответа, без ORM-объектов
+    query = apply_filters(
+        select(*(getattr(TradingResult, name) for name in RESPONSE_FIELDS)).where(TradingResult.date == last_date),
+        TradingResult,
+        request,
+    )
+
+    result = await db.execute(query)
+    return orjson.dumps([dict(row._mapping) for row in result.all()])
 
 
 @router.get("/results", response_model=List[ParsedDataSchema])
 async def get_trading_results(
     request: ResultsRequest = Depends(),
-    db: AsyncSession = Depends(get_db),
     redis: Any = Depends(get_redis_client),
 ):
     """
     Возвращает последние торги по заданным фильтрам.
     """
-    cache_key = generate_cache_key("results", **request.model_dump())
-    cached = await redis.get(cache_key)
-
-    if cached:
-        return json.loads(cached)
-
-    # Получаем последнюю дату торгов
-    last_date_query = (
-        select(ParsedData.date)
-        .distinct()
-        .order_by(ParsedData.date.desc())
-        .limit(1)
-    )
-    last_date_result = await db.execute(last_date_query)
-    last_date = last_date_result.scalar_one_or_none()
+    track_query("results", **request.model_dump())
+    body = await load_once(redis, results_key(request), in_session(redis, lambda db: load_results(db, request)))
+    return json_response(body)
 
-    if not last_date:
-        return []
 
-    # Формируем запрос с фильтром по последней дате
-    query = select(ParsedData).where(ParsedData.date == last_date)
+async def load_aggregates(db, request, group_by) -> bytes:
+    # Запрос к дневным агрегатам вместо таблицы торгов
+    period = func.date_trunc(request.granularity, DailyAggregate.date.cast(DateTime)).cast(Date).label("period")
+    group_columns = [getattr(DailyAggregate, name) for name in group_by]
+    query = (
+        select(
+            period,
+            *group_columns,
+            func.sum(DailyAggregate.volume).cast(BigInteger).label("volume"),
+            func.sum(DailyAggregate.total).cast(BigInteger).label("total"),
+            func.sum(DailyAggregate.count).cast(BigInteger).label("count"),
+        )
+        .group_by(period, *group_columns)
+        .order_by(period, *group_columns)
+    )
 
-    if request.oil_id:
-        query = query.where(ParsedData.oil_id == request.oil_id)
-    if request.delivery_type_id:
-        query = query.where(ParsedData.delivery_type_id ==
-                            request.delivery_type_id)
-    if request.delivery_basis_id:
-        query = query.where(ParsedData.delivery_basis_id ==
-                            request.delivery_basis_id)
+    query = apply_filters(query, DailyAggregate, request)
 
     result = await db.execute(query)
-    rows = result.all()
-    data = [item.to_dict() for item, in rows]
+    # Поля, по которым не группировали, в ответе равны null
+    return orjson.dumps([
+        {name: row._mapping.get(name) for name in AggregateSchema.model_fields} for row in result.all()
+    ])
+
+
+@router.get("/aggregates", response_model=List[AggregateSchema])
+async def get_aggregates(
+    request: AggregatesRequest = Depends(),
+    group_by: List[GroupField] = Query([]),
+    redis: Any = Depends(get_redis_client),
+):
+    """
+    Возвращает суммы volume, total и count за день, неделю или месяц
+    с группировкой по выбранным полям.
+    """
+    group_by = sorted(set(group_by))
+    cache_key = generate_cache_key("aggregates", group_by=group_by, **request.model_dump())
+    body = await load_once(redis, cache_key, in_session(redis, lambda db: load_aggregates(db, request, group_by)))
+    return json_response(body)
+
+
+@router.get("/export", response_class=StreamingResponse, responses=COLUMNAR_RESPONSES)
+async def export_trading(
+    http_request: Request,
+    request: DynamicsRequest = Depends(),
+    fmt: ExportFormat = Query("ndjson", alias="format"),
+    gzip: bool = Query(False),
+    fields: List[DynamicsField] = Query([]),
+    dictionary: bool = Query(False),
+):
+    """
+    Выгружает торги с фильтрами в NDJSON, CSV, Arrow IPC или Parquet потоком, без кэша.
+
+    Строки читаются серверным курсором пачками и отправляются клиенту по мере
+    чтения, поэтому память не зависит от размера выгрузки. Колоночный формат
+    можно запросить и заголовком Accept.
+    """
+    fmt = columnar.negotiate(http_request.headers.get("accept")) or fmt
+    if fmt in columnar.MEDIA_TYPES:
+        columnar_format(fmt)
+    fields = [name for name in RESPONSE_FIELDS if name in fields] or RESPONSE_FIELDS
+    query = apply_filters(
+        select(*(getattr(TradingResult, name) for name in fields)), TradingResult, request
+    ).order_by(TradingResult.date, TradingResult.id)
+
+    async def batches():
+        # Своя сессия: поток читается уже после выхода из эндпоинта
+        async with ReadSessionLocal() as session:
+            result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield rows
+
+    if fmt in columnar.MEDIA_TYPES:
+        chunks = columnar.encode_stream(fmt, columnar.build_schema(fields, dictionary), batches())
+        media_type = columnar.MEDIA_TYPES[fmt]
+    else:
+        chunks = encode_rows(fmt, fields, batches())
+        media_type = MEDIA_TYPES[fmt]
+
+    headers = {"Content-Disposition": f'attachment; filename="trading.{fmt}"'}
+    if gzip:
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
+async def refresh_last_dates(db, cache, n):
+    body = await load_last_dates(db, n)
+    await cache.setex(last_dates_key(n), get_redis_ttl(), body)
+
+
+async def refresh_results(db, cache, **params):
+    request = ResultsRequest(**params)
+    body = await load_results(db, request)
+    await cache.setex(results_key(request), get_redis_ttl(), body)
+
+
+async def refresh_dynamics(db, cache, limit, fields, **params):
+    request = DynamicsRequest(**params)
+    fields = [name for name in RESPONSE_FIELDS if name in fields] or RESPONSE_FIELDS
+    body = await load_dynamics_page(db, request, limit, None, fields)
+    await cache.setex(dynamics_key(request, limit, None, fields), get_redis_ttl(), body)
+
+
+WARMERS = {
+    "last_dates": refresh_last_dates,
+    "results": refresh_results,
+    "dynamics": refresh_dynamics,
+}
+
 
-    await redis.setex(cache_key, get_redis_ttl(), json.dumps(data))
-    return data
+async def warm_cache(cache, top=CACHE_WARM_QUERIES):
+    """Заново заполняет кэш ответами на частые запросы, возвращает число прогретых"""
+    warmed = 0
+    # С основной БД: реплика может ещё не получить только что загруженные данные
+    async with AsyncSessionLocal() as db:
+        for endpoint, params in warm_queries(top):
+            try:
+                await WARMERS[endpoint](db, cache, **params)
+                warmed += 1
+            except Exception as error:
+                logger.warning("Не удалось прогреть %s %s: %s", endpoint, params, error)
+    return warmed
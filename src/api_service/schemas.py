@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
+from typing import Literal, Optional, List
+import datetime
 from datetime import date
 
 
@@ -38,9 +39,62 @@ class DynamicsRequest(BaseModel):
     end_date: Optional[date] = None
 
 
+class DynamicsRowSchema(BaseModel):
+    """Строка /dynamics: с fields= в ответе только запрошенные поля"""
+    exchange_product_id: Optional[str] = None
+    exchange_product_name: Optional[str] = None
+    oil_id: Optional[str] = None
+    delivery_basis_id: Optional[str] = None
+    delivery_basis_name: Optional[str] = None
+    delivery_type_id: Optional[str] = None
+    volume: Optional[int] = None
+    total: Optional[int] = None
+    count: Optional[int] = None
+    # Имя поля date совпадает с типом, поэтому тип указан через модуль datetime
+    date: Optional[datetime.date] = None
+    created_on: Optional[datetime.date] = None
+    updated_on: Optional[datetime.date] = None
+
+
+DynamicsField = Literal[
+    "exchange_product_id", "exchange_product_name", "oil_id", "delivery_basis_id", "delivery_basis_name",
+    "delivery_type_id", "volume", "total", "count", "date", "created_on", "updated_on",
+]
+
+
+# --- Эндпоинт /export ---
+
+ExportFormat = Literal["ndjson", "csv", "arrow", "parquet"]
+
+
 # --- Эндпоинт /results ---
 
 class ResultsRequest(BaseModel):
     oil_id: Optional[str] = None
     delivery_type_id: Optional[str] = None
-    delivery_basis_id: Optional[str] = None
\ No newline at end of file
+    delivery_basis_id: Optional[str] = None
+
+
+# --- Эндпоинт /aggregates ---
+
+Granularity = Literal["day", "week", "month"]
+GroupField = Literal["oil_id", "delivery_basis_id", "delivery_type_id"]
+
+
+class AggregatesRequest(BaseModel):
+    granularity: Granularity = "day"
+    oil_id: Optional[str] = None
+    delivery_type_id: Optional[str] = None
+    delivery_basis_id: Optional[str] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+
+class AggregateSchema(BaseModel):
+    period: date
+    oil_id: Optional[str] = None
+    delivery_basis_id: Optional[str] = None
+    delivery_type_id: Optional[str] = None
+    volume: int
+    total: int
+    count: int
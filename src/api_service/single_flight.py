@@ -0,0 +1,77 @@
+"""Одна загрузка из БД на ключ кэша при одновременных промахах.
+
+Внутри процесса одинаковые промахи ждут общую задачу загрузки. Между
+процессами загрузку выполняет тот, кто взял короткую блокировку в Redis,
+остальные отдают ответ предыдущей версии кэша или ждут, пока значение
+появится в Redis.
+"""
+import asyncio
+import os
+import time
+
+from api_service.redis_cache import get_redis_ttl
+
+# Время жизни блокировки загрузки: должно быть больше времени самого долгого запроса
+CACHE_LOCK_TTL = float(os.getenv("CACHE_LOCK_TTL", "10"))
+# Как часто процесс без блокировки проверяет, появилось ли значение, секунды
+CACHE_LOCK_POLL_INTERVAL = float(os.getenv("CACHE_LOCK_POLL_INTERVAL", "0.05"))
+
+
+class SingleFlight:
+    """Один запуск загрузки на ключ: остальные вызовы ждут тот же результат"""
+
+    def __init__(self):
+        self.calls = {}
+
+    async def do(self, key, func):
+        future = self.calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self.calls[key] = future
+            future.add_done_callback(lambda _: self.calls.pop(key, None))
+        # Отмена одного запроса не отменяет загрузку, которую ждут другие
+        return await asyncio.shield(future)
+
+
+single_flight = SingleFlight()
+
+
+async def fill(cache, key, load, lock_ttl=CACHE_LOCK_TTL, poll_interval=CACHE_LOCK_POLL_INTERVAL, version=None):
+    """Загружает значение и кладёт в кэш, если ключ не загружает другой процесс.
+
+    Значение записывается под версией кэша на момент начала загрузки: загрузка,
+    начатая до уведомления о новых данных, не попадёт в новую версию.
+    """
+    version = version or cache.version
+    token = await cache.lock(key, lock_ttl, version)
+    if token is None:
+        # Загрузка идёт в другом процессе: отдаём устаревший ответ, если он есть
+        stale = await cache.get_stale(key)
+        if stale:
+            return stale
+        deadline = time.monotonic() + lock_ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+            value = await cache.get(key)
+            if value:
+                return value
+        # Владелец блокировки не успел: загружаем сами, блокировку берём, только если она уже истекла
+        token = await cache.lock(key, lock_ttl, version)
+
+    try:
+        body = await load()
+        await cache.setex(key, get_redis_ttl(), body, version)
+        return body
+    finally:
+        if token is not None:
+            await cache.unlock(key, token, version)
+
+
+async def load_once(cache, key, load):
+    """Значение из кэша, при промахе - одна загрузка на ключ в процессе и между процессами"""
+    cached = await cache.get(key)
+    if cached:
+        return cached
+    # Загрузка старой версии не отдаётся запросам, пришедшим после смены версии
+    version = cache.version
+    return await single_flight.do(f"{version}:{key}", lambda: fill(cache, key, load, version=version))
@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from parser_service.database import engine
+from parser_service.models import UNIQUE_KEY
+from parser_service.parser import DATE_INDEX, FIELD_INDEX, LOOKUPS, ParserTrade, STORED_ROW_FIELDS, stored_values
+from shared.partitioning import partition_ddl, partition_lock_sql
+
+# Порядок колонок в записях для COPY: названия продуктов и базисов хранятся в справочниках
+COLUMNS = STORED_ROW_FIELDS + ("created_on", "updated_on")
+
+STAGING_TABLE = "parsed_data_staging"
+
+# Размер буфера по умолчанию: одна пачка COPY на несколько сотен бюллетеней
+FLUSH_SIZE = 50_000
+
+
+class BackfillParserTrade(ParserTrade):
+    """Парсер для исторической загрузки: строки копируются в БД через COPY"""
+
+    def __init__(self, *args, flush_size=FLUSH_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flush_size = flush_size
+        self.buffer = []
+        # Названия из буфера по справочникам: {поле кода: {код: (название, дата бюллетеня)}}
+        self.names = {key: {} for _, key, _ in LOOKUPS}
+        self.flush_lock = asyncio.Lock()
+        self.rows_loaded = 0
+        self.copy_seconds = 0.0
+
+    async def save_rows(self, rows):
+        """Складывает строки в буфер и сбрасывает его в БД при заполнении"""
+        today = datetime.now().date()
+        # Записи для COPY собираются из кортежей разбора напрямую
+        self.buffer.extend(stored_values(row) + (today, today) for row in rows)
+        for _, key, name in LOOKUPS:
+            key_index, name_index = FIELD_INDEX[key], FIELD_INDEX[name]
+            seen_names = self.names[key]
+            for row in rows:
+                code, title, day = row[key_index], row[name_index], row[DATE_INDEX]
+                if code and title:
+                    seen = seen_names.get(code)
+                    if seen is None or day >= seen[1]:
+                        seen_names[code] = (title, day)
+
+        if len(self.buffer) >= self.flush_size:
+            await self.flush()
+
+    async def flush(self):
+        """Копирует буфер во временную таблицу и сливает его в parsed_data.
+
+        При ошибке строки возвращаются в буфер и повторяются следующим flush;
+        ошибка последнего flush в run завершает загрузку с ненулевым кодом.
+        """
+        async with self.flush_lock:
+            records, self.buffer = self.buffer, []
+            names, self.names = self.names, {key: {} for _, key, _ in LOOKUPS}
+            if not records:
+                return
+
+            try:
+                await self._copy(records, names)
+            except Exception:
+                # Строки уже не в буфере: возвращаем их, иначе сбой посреди обхода
+                # молча потеряет до flush_size строк из разных бюллетеней
+                self.buffer[:0] = records
+                for key, seen in names.items():
+                    for code, (title, day) in seen.items():
+                        current = self.names[key].get(code)
+                        if current is None or day > current[1]:
+                            self.names[key][code] = (title, day)
+                raise
+
+    async def _copy(self, records, names):
+        """Одна транзакция: COPY во временную таблицу, слияние, справочники и агрегаты"""
+        started = time.perf_counter()
+        key = ", ".join(UNIQUE_KEY.columns.keys())
+        columns = ", ".join(COLUMNS)
+        updates = ", ".join(
+            f"{name} = EXCLUDED.{name}"
+            for name in COLUMNS
+            if name not in UNIQUE_KEY.columns and name != "created_on"
+        )
+
+        dates = {record[COLUMNS.index("date")] for record in records}
+        months = self._missing_partitions(dates)
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            pg = raw.driver_connection
+            async with pg.transaction():
+                for month in months:
+                    await pg.execute(partition_lock_sql(month))
+                    await pg.execute(partition_ddl(month))
+                # Исторические бюллетени не заменяют названия из более свежих, как в save_rows;
+                # коды отсортированы, чтобы строки справочника блокировались в одном порядке
+                for model, code, title in LOOKUPS:
+                    if names[code]:
+                        table = model.__tablename__
+                        seen = sorted(names[code].items())
+                        await pg.execute(
+                            f"INSERT INTO {table} ({code}, {title}, last_seen_date) "
+                            "SELECT * FROM unnest($1::text[], $2::text[], $3::date[]) "
+                            f"ON CONFLICT ({code}) DO UPDATE "
+                            f"SET {title} = EXCLUDED.{title}, last_seen_date = EXCLUDED.last_seen_date "
+                            f"WHERE {table}.last_seen_date < EXCLUDED.last_seen_date "
+                            f"OR ({table}.last_seen_date = EXCLUDED.last_seen_date "
+                            f"AND {table}.{title} IS DISTINCT FROM EXCLUDED.{title})",
+                            [item for item, _ in seen],
+                            [name for _, (name, _) in seen],
+                            [day for _, (_, day) in seen],
+                        )
+                await pg.execute(
+                    f"CREATE TEMP TABLE {STAGING_TABLE} ON COMMIT DROP AS "
+                    f"SELECT {columns} FROM parsed_data WITH NO DATA"
+                )
+                await pg.copy_records_to_table(STAGING_TABLE, records=records, columns=COLUMNS)
+                # Из повторов ключа оставляем последнюю скопированную строку, как save_rows:
+                # COPY в новую таблицу пишет строки подряд, ctid растёт в порядке записей
+                await pg.execute(
+                    f"INSERT INTO parsed_data ({columns}) "
+                    f"SELECT DISTINCT ON ({key}) {columns} FROM {STAGING_TABLE} "
+                    f"ORDER BY {key}, ctid DESC "
+                    f"ON CONFLICT ({key}) DO UPDATE SET {updates}"
+                )
+                await pg.execute(
+                    "INSERT INTO trading_dates (date, row_count, ingested_at) "
+                    "SELECT date, count(*), now() FROM parsed_data "
+                    f"WHERE date IN (SELECT DISTINCT date FROM {STAGING_TABLE}) "
+                    "GROUP BY date "
+                    "ON CONFLICT (date) DO UPDATE "
+                    "SET row_count = EXCLUDED.row_count, ingested_at = EXCLUDED.ingested_at"
+                )
+                await pg.execute(
+                    f"DELETE FROM daily_aggregates WHERE date IN (SELECT DISTINCT date FROM {STAGING_TABLE})"
+                )
+                await pg.execute(
+                    "INSERT INTO daily_aggregates (date, oil_id, delivery_basis_id, delivery_type_id, "
+                    "volume, total, count, row_count) "
+                    "SELECT date, coalesce(oil_id, ''), coalesce(delivery_basis_id, ''), "
+                    "coalesce(delivery_type_id, ''), coalesce(sum(volume), 0), coalesce(sum(total), 0), "
+                    "coalesce(sum(count), 0), count(*) FROM parsed_data "
+                    f"WHERE date IN (SELECT DISTINCT date FROM {STAGING_TABLE}) "
+                    "GROUP BY 1, 2, 3, 4"
+                )
+        self.partitions.update(months)
+        self.ingested_dates.update(dates)
+
+        elapsed = time.perf_counter() - started
+        self.rows_loaded += len(records)
+        self.copy_seconds += elapsed
+        print(f"COPY: {len(records)} записей за {elapsed:.2f} с "
+              f"({len(records) / elapsed:.0f} записей/с)")
+
+    async def notify_ingest(self):
+        """Сбрасывает остаток буфера, затем уведомляет API об уже загруженном"""
+        try:
+            await self.flush()
+        finally:
+            await super().notify_ingest()
+
+    async def run(self):
+        """Запускает загрузку и выводит итоговую скорость"""
+        started = time.perf_counter()
+        await super().run()
+
+        elapsed = time.perf_counter() - started
+        print(f"Загружено {self.rows_loaded} записей за {elapsed:.1f} с: "
+              f"{self.rows_loaded / elapsed:.0f} записей/с всего, "
+              f"{self.rows_loaded / max(self.copy_seconds, 1e-9):.0f} записей/с на COPY")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Историческая загрузка бюллетеней через COPY")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d"),
+                        default=datetime(2023, 1, 1), help="минимальная дата бюллетеня, ГГГГ-ММ-ДД")
+    parser.add_argument("--max-pages", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--flush-size", type=int, default=FLUSH_SIZE)
+    parser.add_argument("--cache-dir", help="каталог локального кэша страниц и XLS")
+    parser.add_argument("--offline", action="store_true", help="работать только с локальным кэшем")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    backfill = BackfillParserTrade(
+        max_pages=args.max_pages,
+        min_date=args.since,
+        cache_dir=args.cache_dir,
+        offline=args.offline,
+        concurrency=args.concurrency,
+        flush_size=args.flush_size,
+    )
+    asyncio.run(backfill.run())
@@ -1,18 +1,5 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import declarative_base, sessionmaker
-from dotenv import load_dotenv
-import os
+from shared.database import Base, DATABASE_URL, create_engine, create_sessionmaker  # noqa: F401
 
-load_dotenv()
+engine = create_engine()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-engine = create_async_engine(DATABASE_URL, echo=False)
-
-AsyncSessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
-
-Base = declarative_base()
\ No newline at end of file
+AsyncSessionLocal = create_sessionmaker(engine)
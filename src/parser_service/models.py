@@ -1,19 +1,3 @@
-from sqlalchemy import Column, Integer, String, Date
-from parser_service.database import Base
-
-class ParsedData(Base):
-    __tablename__ = 'parsed_data'
-    
-    id = Column(Integer, primary_key=True)
-    exchange_product_id = Column(String, nullable=True)
-    exchange_product_name = Column(String, nullable=True)
-    oil_id = Column(String, nullable=True)
-    delivery_basis_id = Column(String, nullable=True)
-    delivery_basis_name = Column(String, nullable=True)
-    delivery_type_id = Column(String, nullable=True)
-    volume = Column(Integer, nullable=True)
-    total = Column(Integer, nullable=True)
-    count = Column(Integer, nullable=True)
-    date = Column(Date, nullable=True)
-    created_on = Column(Date, nullable=True)
-    updated_on = Column(Date, nullable=True)
\ No newline at end of file
+from shared.models import (  # noqa: F401
+    AGGREGATE_DIMENSIONS, DailyAggregate, DeliveryBasis, ParsedData, Product, TradingDate, UNIQUE_KEY,
+)
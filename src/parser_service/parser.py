@@ -2,21 +2,196 @@ from bs4 import BeautifulSoup
 from datetime import datetime
 import xlrd
 import io
+import json
 import asyncio
 import aiohttp
-from parser_service.models import ParsedData
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+from parser_service.models import (
+    AGGREGATE_DIMENSIONS, DailyAggregate, DeliveryBasis, ParsedData, Product, TradingDate, UNIQUE_KEY,
+)
 from parser_service.database import engine, AsyncSessionLocal
-from sqlalchemy import insert
+from parser_service.scheduler import AdaptiveLimiter, RetryPolicy, RETRY_STATUSES, parse_retry_after
+from parser_service.xls_cache import XlsCache
+from shared.events import ingest_notify_stmt
+from shared.migrate import upgrade
+from shared.partitioning import is_partitioned, month_start, months_ahead, partition_ddl, partition_lock_sql
+from sqlalchemy import and_, delete, func, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+# Postgres ограничивает число параметров в запросе 32767,
+# при 12 колонках на строку 1000 строк в пачке укладываются с запасом
+BATCH_SIZE = 1000
+
+# Параметры пула соединений HTTP-сессии
+LIMIT_PER_HOST = 10
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+
+BASE_URL = "https://spimex.com"
+
+# Таймаут одной попытки HTTP-запроса, секунды
+REQUEST_TIMEOUT = 10
+
+# Повторы неудачных запросов
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5
+
+# Размер пула процессов для разбора XLS, 0 - разбор в текущем процессе
+PARSE_WORKERS = 0
+
+# Порядок полей в строках, которые возвращает parse_xls
+ROW_FIELDS = (
+    "exchange_product_id",
+    "exchange_product_name",
+    "oil_id",
+    "delivery_basis_id",
+    "delivery_basis_name",
+    "delivery_type_id",
+    "volume",
+    "total",
+    "count",
+    "date",
+)
+
+# Поля строки, которые хранятся в parsed_data; названия уходят в справочники
+STORED_FIELDS = frozenset(ParsedData.__table__.columns.keys())
+
+# Строки доходят до записи в БД кортежами: поля берутся по позиции, без словаря на строку
+FIELD_INDEX = {name: index for index, name in enumerate(ROW_FIELDS)}
+DATE_INDEX = FIELD_INDEX["date"]
+STORED_ROW_FIELDS = tuple(name for name in ROW_FIELDS if name in STORED_FIELDS)
+stored_values = itemgetter(*(FIELD_INDEX[name] for name in STORED_ROW_FIELDS))
+row_key = itemgetter(*(FIELD_INDEX[name] for name in UNIQUE_KEY.columns.keys()))
+
+# Справочники названий: модель, поле кода и поле названия в строках
+LOOKUPS = (
+    (Product, "exchange_product_id", "exchange_product_name"),
+    (DeliveryBasis, "delivery_basis_id", "delivery_basis_name"),
+)
+
+
+def parse_xls(content, date):
+    """Разбирает XLS-бюллетень и возвращает строки-кортежи в порядке ROW_FIELDS.
+
+    Чистая функция без состояния: её можно отправлять в пул процессов.
+    """
+    book = xlrd.open_workbook(file_contents=content)
+    return sheet_to_rows(book.sheet_by_index(0), date)
+
+
+def sheet_to_rows(sheet, date):
+    """Собирает строки из колонок листа целиком, без обхода листа по строкам"""
+    if sheet.nrows == 0 or sheet.ncols < 6:
+        return []
+
+    day = date.date() if hasattr(date, 'date') else date
+    product_ids = sheet.col_values(1)
+    counts = sheet.col_values(sheet.ncols - 1)
+
+    # Строки с данными: код инструмента из 11 символов и целое число договоров
+    selected = [
+        i for i, (product_id, count) in enumerate(zip(product_ids, counts))
+        if isinstance(product_id, str) and len(product_id) == 11
+        and isinstance(count, str) and count.isdigit()
+    ]
+    if not selected:
+        return []
+
+    names = sheet.col_values(2)
+    bases = sheet.col_values(3)
+    volumes = sheet.col_values(4)
+    totals = sheet.col_values(5)
+
+    return [
+        (
+            product_ids[i],
+            names[i],
+            product_ids[i][:4],
+            product_ids[i][4:7],
+            bases[i],
+            product_ids[i][-1],
+            int(volumes[i]),
+            int(totals[i].partition('.')[0]),
+            int(counts[i]),
+            day,
+        )
+        for i in selected
+    ]
 
 
 class ParserTrade:
 
-    def __init__(self, max_pages=100, min_date=datetime(2023, 1, 1), concurrency=3):
+    def __init__(self, max_pages=100, min_date=datetime(2023, 1, 1), concurrency=3, incremental=False,
+                 batch_size=BATCH_SIZE, limit_per_host=LIMIT_PER_HOST, dns_cache_ttl=DNS_CACHE_TTL,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, parse_workers=PARSE_WORKERS, cache_dir=None,
+                 offline=False, base_url=BASE_URL, max_concurrency=None, request_timeout=REQUEST_TIMEOUT,
+                 retry_attempts=RETRY_ATTEMPTS, retry_base_delay=RETRY_BASE_DELAY, dead_letters_path=None):
         self.max_pages = max_pages
         self.min_date = min_date
-        self.base_url = "https://spimex.com"
+        self.base_url = base_url.rstrip("/")
         self.concurrency = concurrency
         self.semaphore = asyncio.Semaphore(concurrency)
+        self.incremental = incremental
+        self.known_dates = set()
+        self.stop_event = asyncio.Event()
+        self.batch_size = batch_size
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.session = None
+        self.connection_stats = {"opened": 0, "reused": 0}
+        self.parse_workers = parse_workers
+        self.executor = None
+        self.cache = XlsCache(cache_dir) if cache_dir else None
+        self.offline = offline
+        self.request_timeout = request_timeout
+        self.max_concurrency = max_concurrency or limit_per_host
+        self.limiter = AdaptiveLimiter(limit_per_host, max_limit=self.max_concurrency)
+        self.retry_policy = RetryPolicy(retry_attempts, retry_base_delay)
+        self.dead_letters = []
+        self.dead_letters_path = dead_letters_path
+        self.partitioned = False
+        self.partitions = set()
+        # Даты, загруженные с последнего уведомления API
+        self.ingested_dates = set()
+
+    async def __aenter__(self):
+        """Открывает общую HTTP-сессию и пул разбора XLS на всё время работы парсера"""
+        self.session = self._create_session()
+        if self.parse_workers > 0:
+            self.executor = ProcessPoolExecutor(self.parse_workers)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+        if self.executor:
+            # Ожидание завершения процессов разбора не должно блокировать цикл событий
+            await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+            self.executor = None
+        print(f"HTTP-соединений открыто: {self.connection_stats['opened']}, "
+              f"переиспользовано: {self.connection_stats['reused']}")
+
+    def _create_session(self):
+        """Создаёт сессию с пулом keep-alive соединений и кэшем DNS"""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_opened)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.max_concurrency,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+            ssl=False,
+        )
+        return aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+
+    async def _on_connection_opened(self, session, ctx, params):
+        self.connection_stats["opened"] += 1
+
+    async def _on_connection_reused(self, session, ctx, params):
+        self.connection_stats["reused"] += 1
 
     async def generate_urls(self):
         """Генерирует список URL для парсинга"""
@@ -34,13 +209,12 @@ class ParserTrade:
     async def _fetch_page(self, session, url):
         """Парсит страницу и обрабатывает найденные ссылки"""
         async with self.semaphore:
+            if self.stop_event.is_set():
+                return
             try:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        await self._process_links(content)
-                    else:
-                        print(f"Ошибка при загрузке страницы {url}, статус: {response.status}")
+                content = await self.fetch(url, session)
+                if content is not None:
+                    await self._process_links(content)
             except Exception as e:
                 print(f"Ошибка при обработке {url}: {e}")
 
@@ -68,97 +242,341 @@ class ParserTrade:
 
             if date_parsed < self.min_date:
                 print("Дата слишком старая. Прекращаем обработку.")
+                self.stop_event.set()
+                break
+
+            if self.incremental and date_parsed.date() in self.known_dates:
+                print(f"Бюллетень за {date_span.text.strip()} уже загружен. Прекращаем обработку.")
+                self.stop_event.set()
                 break
 
             if "oil_xls" in url:
                 print(f"Обнаружена ссылка: {url}")
-                xls_data = await self.download_xls(url)
-                if xls_data:
-                    await self.process_xls_and_save(xls_data, date_parsed)
-
-    async def download_xls(self, url):
-        """Скачивает файл по ссылке"""
-        connector = aiohttp.TCPConnector(limit_per_host=3, ssl=False)
-        async with aiohttp.ClientSession(connector=connector) as session:
+                await self._handle_link(url, date_parsed)
+
+    async def _handle_link(self, url, date):
+        """Скачивает бюллетень и сохраняет его в БД.
+
+        Бюллетень, который не удалось разобрать или сохранить, попадает в dead_letters
+        и будет повторён вместе с недоскачанными.
+        """
+        xls_data = await self.download_xls(url, date=date)
+        if xls_data:
+            try:
+                await self.process_xls_and_save(xls_data, date)
+            except Exception as e:
+                print(f"Ошибка при обработке файла {url}: {e}")
+                self.dead_letters.append({"url": url, "date": date, "error": str(e) or type(e).__name__})
+
+    async def download_xls(self, url, date=None):
+        """Скачивает файл по ссылке через общую сессию"""
+        content = await self.fetch(url, date=date)
+        return io.BytesIO(content) if content is not None else None
+
+    async def fetch(self, url, session=None, date=None):
+        """Загружает URL с учётом локального кэша, повторами и адаптивным параллелизмом.
+
+        Если URL уже в кэше, отправляется условный запрос: при 304 или недоступности
+        сайта содержимое берётся с диска. В режиме offline сеть не используется.
+        Ответы 429/5xx и сетевые ошибки повторяются с экспоненциальной задержкой и
+        уменьшают параллелизм. URL, который так и не удалось загрузить, попадает в
+        dead_letters вместе с датой бюллетеня (для страниц дата None).
+        """
+        entry = await self.cache.get(url) if self.cache else None
+        if self.offline:
+            if entry:
+                return await self.cache.read(entry)
+            print(f"Нет в кэше: {url}")
+            return None
+
+        session = session or self.session
+        headers = XlsCache.conditional_headers(entry) if entry else {}
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        error, retry_after = None, None
+
+        for attempt in range(self.retry_policy.attempts):
+            if attempt:
+                await asyncio.sleep(self.retry_policy.delay(attempt, retry_after))
+                retry_after = None
+            request = None
             try:
-                async with session.get(url, timeout=10) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        return io.BytesIO(content)
-                    else:
-                        print(f"Ошибка при загрузке файла {url}, статус: {response.status}")
-                        return None
+                async with self.limiter as request:
+                    async with session.get(url, headers=headers, timeout=timeout) as response:
+                        if response.status == 304 and entry:
+                            self.limiter.on_success()
+                            return await self.cache.read(entry)
+                        if response.status == 200:
+                            content = await response.read()
+                            self.limiter.on_success()
+                            if self.cache:
+                                await self.cache.put(url, content, response.headers.get("ETag"),
+                                                     response.headers.get("Last-Modified"))
+                            return content
+                        error = f"статус {response.status}"
+                        if response.status not in RETRY_STATUSES:
+                            print(f"Ошибка при загрузке {url}: {error}, без повторов")
+                            break
+                        self.limiter.on_throttle(request)
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
             except Exception as e:
-                print(f"Ошибка при загрузке: {url}: {e}")
-                return None
+                error = str(e) or type(e).__name__
+                self.limiter.on_throttle(request)
+            print(f"Ошибка при загрузке {url} (попытка {attempt + 1}): {error}")
+
+        if entry:
+            print(f"Используем копию из кэша: {url}")
+            return await self.cache.read(entry)
+
+        self.dead_letters.append({"url": url, "date": date, "error": error})
+        return None
+
+    async def retry_dead_letters(self):
+        """Повторно обрабатывает URL, которые не удалось загрузить"""
+        dead_letters, self.dead_letters = self.dead_letters, []
+        # Страницы, которые не загрузились, могли оказаться до остановки обхода
+        self.stop_event.clear()
+        print(f"Повторная обработка {len(dead_letters)} URL")
+        for letter in dead_letters:
+            if letter["date"] is None:
+                await self._fetch_page(self.session, letter["url"])
+            else:
+                await self._handle_link(letter["url"], letter["date"])
+
+    def save_dead_letters(self, path):
+        """Сохраняет необработанные URL в JSON, чтобы повторить их позже"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([
+                {**letter, "date": letter["date"].isoformat() if letter["date"] else None}
+                for letter in self.dead_letters
+            ], f, ensure_ascii=False, indent=2)
+
+    def load_dead_letters(self, path):
+        with open(path, encoding="utf-8") as f:
+            self.dead_letters = [
+                {**letter, "date": datetime.fromisoformat(letter["date"]) if letter["date"] else None}
+                for letter in json.load(f)
+            ]
 
     async def process_xls_and_save(self, xls_data, date):
         """Обрабатывает скачанный XLS и сохраняет данные в БД"""
-        try:
-            book = xlrd.open_workbook(file_contents=xls_data.getvalue())
-            sheet = book.sheet_by_index(0)
+        rows = await self.parse(xls_data.getvalue(), date)
+        if rows:
+            await self.save_rows(rows)
 
-            data_list = []
+    async def parse(self, content, date):
+        """Разбирает XLS в пуле процессов или на месте, если пул не задан"""
+        if self.executor is None:
+            return parse_xls(content, date)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, parse_xls, content, date)
 
-            for row_num in range(sheet.nrows):
-                cols = sheet.row_values(row_num)
+    async def save_rows(self, rows):
+        """Сохраняет строки-кортежи (порядок ROW_FIELDS) пачками через INSERT ... ON CONFLICT DO UPDATE"""
+        # Повтор ключа внутри одного INSERT ... ON CONFLICT недопустим, оставляем последнюю строку
+        rows = list({row_key(row): row for row in rows}.values())
 
-                if len(cols) < 6:
+        today = datetime.now().date()
+        dates = {row[DATE_INDEX] for row in rows}
+        months = self._missing_partitions(dates)
+        lookups = self._lookup_stmts(rows)
+        # Названия хранятся в справочниках, в parsed_data - только коды;
+        # словарь на строку собирается один раз, для VALUES
+        data_list = [
+            dict(zip(STORED_ROW_FIELDS, stored_values(row)), created_on=today, updated_on=today) for row in rows
+        ]
+        async with AsyncSessionLocal() as session:
+            # Месяцы отсортированы: блокировки берутся в одном порядке во всех транзакциях
+            for month in months:
+                await session.execute(text(partition_lock_sql(month)))
+                await session.execute(text(partition_ddl(month)))
+            for stmt in lookups:
+                await session.execute(stmt)
+            for start in range(0, len(data_list), self.batch_size):
+                stmt = insert(ParsedData).values(data_list[start:start + self.batch_size])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=UNIQUE_KEY.columns.keys(),
+                    set_={
+                        name: stmt.excluded[name]
+                        for name in data_list[0]
+                        if name not in UNIQUE_KEY.columns and name != "created_on"
+                    },
+                )
+                await session.execute(stmt)
+            await session.execute(self._trading_dates_stmt(dates))
+            for stmt in self._daily_aggregates_stmts(dates):
+                await session.execute(stmt)
+            await session.commit()
+        self.partitions.update(months)
+        self.ingested_dates.update(dates)
+        print(f"Сохранено {len(data_list)} записей")
+
+    @staticmethod
+    def _lookup_stmts(rows):
+        """Upsert справочников названий продуктов и базисов по загруженным строкам.
+
+        Название обновляется, только если строка не старше бюллетеня, из которого
+        оно взято: загрузка архива не заменяет текущие названия историческими.
+        """
+        stmts = []
+        for model, key, name in LOOKUPS:
+            key_index, name_index = FIELD_INDEX[key], FIELD_INDEX[name]
+            values = {}
+            for row in rows:
+                code, title, day = row[key_index], row[name_index], row[DATE_INDEX]
+                if not (code and title):
                     continue
+                if code not in values or day >= values[code][1]:
+                    values[code] = (title, day)
+            if not values:
+                continue
+            # Строки справочника блокируются в порядке кодов: параллельные загрузки
+            # с общими продуктами ждут друг друга, а не взаимно блокируются
+            stmt = insert(model).values([
+                {key: code, name: title, "last_seen_date": day} for code, (title, day) in sorted(values.items())
+            ])
+            stmts.append(stmt.on_conflict_do_update(
+                index_elements=[key],
+                set_={name: stmt.excluded[name], "last_seen_date": stmt.excluded.last_seen_date},
+                # Неизменившиеся названия из того же бюллетеня не перезаписываем
+                where=or_(
+                    model.last_seen_date < stmt.excluded.last_seen_date,
+                    and_(
+                        model.last_seen_date == stmt.excluded.last_seen_date,
+                        getattr(model, name).is_distinct_from(stmt.excluded[name]),
+                    ),
+                ),
+            ))
+        return stmts
+
+    def _missing_partitions(self, dates):
+        """Месяцы загружаемых дат, для которых ещё не создавались секции parsed_data"""
+        if not self.partitioned:
+            return []
+        return sorted({month_start(day) for day in dates} - self.partitions)
 
-                product_id = cols[1]
-                count = cols[-1]
-
-                if len(product_id) == 11 and count.isdigit():
-                    data_list.append({
-                        "exchange_product_id": product_id,
-                        "exchange_product_name": cols[2],
-                        "oil_id": product_id[:4],
-                        "delivery_basis_id": product_id[4:7],
-                        "delivery_basis_name": cols[3],
-                        "delivery_type_id": product_id[-1],
-                        "volume": int(cols[4]),
-                        "total": int(cols[5]) if '.' not in cols[5] else int(cols[5].split('.')[0]),
-                        "count": int(cols[-1]),
-                        "date": date.date() if hasattr(date, 'date') else date,
-                    })
-
-            if data_list:
-                async with AsyncSessionLocal() as session:
-                    stmt = insert(ParsedData).values(data_list)
-                    await session.execute(stmt)
-                    await session.commit()
-                    print(f"Сохранено {len(data_list)} записей")
-
-        except Exception as e:
-            print(f"Ошибка при обработке файла: {e}")
+    @staticmethod
+    def _trading_dates_stmt(dates):
+        """Пересчитывает строки trading_dates для загруженных дат в той же транзакции"""
+        stmt = insert(TradingDate).from_select(
+            ["date", "row_count", "ingested_at"],
+            select(ParsedData.date, func.count(), func.now())
+            .where(ParsedData.date.in_(dates))
+            .group_by(ParsedData.date),
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[TradingDate.date],
+            set_={"row_count": stmt.excluded.row_count, "ingested_at": stmt.excluded.ingested_at},
+        )
+
+    @staticmethod
+    def _daily_aggregates_stmts(dates):
+        """Пересчитывает дневные агрегаты за загруженные даты в той же транзакции"""
+        dimensions = [func.coalesce(getattr(ParsedData, name), "") for name in AGGREGATE_DIMENSIONS]
+        stmt = insert(DailyAggregate).from_select(
+            ["date", *AGGREGATE_DIMENSIONS, "volume", "total", "count", "row_count"],
+            select(
+                ParsedData.date,
+                *dimensions,
+                func.coalesce(func.sum(ParsedData.volume), 0),
+                func.coalesce(func.sum(ParsedData.total), 0),
+                func.coalesce(func.sum(ParsedData.count), 0),
+                func.count(),
+            )
+            .where(ParsedData.date.in_(dates))
+            .group_by(ParsedData.date, *dimensions),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["date", *AGGREGATE_DIMENSIONS],
+            set_={name: stmt.excluded[name] for name in ("volume", "total", "count", "row_count")},
+        )
+        # Удаляем группы за эти даты целиком: после перезагрузки бюллетеня часть групп могла исчезнуть
+        return [delete(DailyAggregate).where(DailyAggregate.date.in_(dates)), stmt]
 
     async def request_site(self):
         """Запускает парсинг страниц"""
-        connector = aiohttp.TCPConnector(limit_per_host=10, ssl=False)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            tasks = await self.create_tasks(session)
-            await asyncio.gather(*tasks)
+        tasks = await self.create_tasks(self.session)
+        await asyncio.gather(*tasks)
 
     async def _init_db(self):
-        """Создаёт таблицы в БД"""
+        """Применяет миграции схемы БД"""
         async with engine.begin() as conn:
-            await conn.run_sync(ParsedData.metadata.create_all)
-        print("Таблицы созданы и проверены")
+            await conn.run_sync(upgrade)
+            self.partitioned = await conn.run_sync(is_partitioned)
+            if self.partitioned:
+                # Секции на ближайшие месяцы создаются заранее, до прихода бюллетеней
+                months = months_ahead(datetime.now().date())
+                for month in months:
+                    await conn.execute(text(partition_lock_sql(month)))
+                    await conn.execute(text(partition_ddl(month)))
+                self.partitions.update(months)
+        print("Схема БД обновлена")
+
+    async def notify_ingest(self):
+        """Одно уведомление API на все даты, загруженные с прошлого уведомления.
+
+        Каждое уведомление сбрасывает весь кэш API и прогревает его заново, поэтому
+        оно отправляется раз за запуск, а не после каждого сохранённого бюллетеня.
+        """
+        if not self.ingested_dates:
+            return
+        dates, self.ingested_dates = self.ingested_dates, set()
+        async with AsyncSessionLocal() as session:
+            await session.execute(ingest_notify_stmt(dates))
+            await session.commit()
 
-    async def run(self):
-        """Основной метод запуска парсера"""
+    async def _load_known_dates(self):
+        """Загружает даты бюллетеней, которые уже есть в БД"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(TradingDate.date))
+            self.known_dates = {row[0] for row in result.all() if row[0]}
+        print(f"В БД уже есть бюллетени за {len(self.known_dates)} дат")
+
+    async def run(self, retry_dead_letters=False):
+        """Основной метод запуска парсера.
+
+        С retry_dead_letters=True вместо обхода страниц повторяются URL из dead_letters_path.
+        """
         await self._init_db()
 
-        await self.request_site()
+        if self.incremental:
+            await self._load_known_dates()
+
+        try:
+            async with self:
+                if retry_dead_letters:
+                    self.load_dead_letters(self.dead_letters_path)
+                    await self.retry_dead_letters()
+                else:
+                    await self.request_site()
+        finally:
+            # Загруженное зафиксировано и при прерванном обходе: API должен его увидеть
+            await self.notify_ingest()
+
+        if self.dead_letters:
+            print(f"Не удалось загрузить {len(self.dead_letters)} URL")
+            if self.dead_letters_path:
+                self.save_dead_letters(self.dead_letters_path)
+                print(f"Список сохранён в {self.dead_letters_path}")
         print("Парсинг завершён, все данные сохранены в БД.")
 
 
 if __name__ == "__main__":
+    import argparse
     from datetime import datetime
+
+    arg_parser = argparse.ArgumentParser(description="Парсер бюллетеней spimex")
+    arg_parser.add_argument("--incremental", action="store_true")
+    arg_parser.add_argument("--cache-dir", help="каталог локального кэша страниц и XLS")
+    arg_parser.add_argument("--offline", action="store_true", help="работать только с локальным кэшем")
+    arg_parser.add_argument("--dead-letters", help="JSON-файл для URL, которые не удалось загрузить")
+    arg_parser.add_argument("--retry-dead-letters", action="store_true",
+                            help="повторить URL из файла --dead-letters вместо обхода страниц")
+    args = arg_parser.parse_args()
+
     start = datetime.now()
     # TODO: Убрать максимальное количество страниц, чтобы по умолчанию было 100
-    parser = ParserTrade(max_pages=2, min_date=datetime(2023, 1, 1))
-    asyncio.run(parser.run())
+    parser = ParserTrade(max_pages=2, min_date=datetime(2023, 1, 1), incremental=args.incremental,
+                         cache_dir=args.cache_dir, offline=args.offline, dead_letters_path=args.dead_letters)
+    asyncio.run(parser.run(retry_dead_letters=args.retry_dead_letters))
     end = datetime.now()
     print(f"Затраченное время: {end - start}")
\ No newline at end of file
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from parser_service.parser import ParserTrade
+
+# Параметры конвейера по умолчанию
+DOWNLOAD_WORKERS = 8
+PARSE_WORKERS = 4
+QUEUE_SIZE = 100
+WRITE_BATCH_SIZE = 5000
+
+
+class PipelineParserTrade(ParserTrade):
+    """Парсер-конвейер: обход страниц -> скачивание XLS -> разбор XLS -> запись в БД.
+
+    Стадии связаны ограниченными очередями, у каждой стадии свой пул исполнителей.
+    Разбор идёт в пуле процессов из parse_workers процессов.
+    """
+
+    def __init__(self, *args, download_workers=DOWNLOAD_WORKERS, parse_workers=PARSE_WORKERS,
+                 queue_size=QUEUE_SIZE, write_batch_size=WRITE_BATCH_SIZE, **kwargs):
+        super().__init__(*args, parse_workers=parse_workers, **kwargs)
+        self.download_workers = download_workers
+        self.queue_size = queue_size
+        self.write_batch_size = write_batch_size
+        self.link_queue = None
+        self.parse_queue = None
+        self.write_queue = None
+        self.write_buffer = []
+        # Бюллетени (url, дата), строки которых лежат в write_buffer
+        self.write_sources = []
+
+    async def _handle_link(self, url, date):
+        """Передаёт найденную ссылку на стадию скачивания"""
+        await self.link_queue.put((url, date))
+
+    async def _download_worker(self):
+        """Стадия скачивания: ссылка -> содержимое XLS"""
+        while True:
+            url, date = await self.link_queue.get()
+            try:
+                xls_data = await self.download_xls(url, date=date)
+                if xls_data:
+                    await self.parse_queue.put((url, xls_data.getvalue(), date))
+            except Exception as e:
+                print(f"Ошибка при скачивании {url}: {e}")
+            finally:
+                self.link_queue.task_done()
+
+    async def _parse_worker(self):
+        """Стадия разбора: содержимое XLS -> строки, разбор идёт вне цикла событий"""
+        while True:
+            url, content, date = await self.parse_queue.get()
+            try:
+                rows = await self.parse(content, date)
+                if rows:
+                    await self.write_queue.put((url, date, rows))
+            except Exception as e:
+                print(f"Ошибка при обработке файла {url}: {e}")
+                self.dead_letters.append({"url": url, "date": date, "error": str(e) or type(e).__name__})
+            finally:
+                self.parse_queue.task_done()
+
+    async def _write_worker(self):
+        """Стадия записи: копит строки и сохраняет их крупными пачками"""
+        while True:
+            url, date, rows = await self.write_queue.get()
+            try:
+                self.write_buffer.extend(rows)
+                self.write_sources.append((url, date))
+                if len(self.write_buffer) >= self.write_batch_size:
+                    await self._flush_writes()
+            finally:
+                self.write_queue.task_done()
+
+    async def _flush_writes(self):
+        """Сохраняет накопленные строки; при ошибке их бюллетени уходят в dead_letters"""
+        rows, self.write_buffer = self.write_buffer, []
+        sources, self.write_sources = self.write_sources, []
+        if not rows:
+            return
+        try:
+            await self.save_rows(rows)
+        except Exception as e:
+            print(f"Ошибка при сохранении в БД: {e}")
+            error = str(e) or type(e).__name__
+            self.dead_letters.extend({"url": url, "date": date, "error": error} for url, date in sources)
+
+    @asynccontextmanager
+    async def _stages(self):
+        """Запускает стадии конвейера и дожидается, пока они обработают все ссылки"""
+        self.link_queue = asyncio.Queue(self.queue_size)
+        self.parse_queue = asyncio.Queue(self.queue_size)
+        self.write_queue = asyncio.Queue(self.queue_size)
+
+        workers = (
+            [asyncio.create_task(self._download_worker()) for _ in range(self.download_workers)]
+            + [asyncio.create_task(self._parse_worker()) for _ in range(max(self.parse_workers, 1))]
+            + [asyncio.create_task(self._write_worker())]
+        )
+
+        try:
+            yield
+            for queue in (self.link_queue, self.parse_queue, self.write_queue):
+                await queue.join()
+            await self._flush_writes()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def request_site(self):
+        """Запускает стадии конвейера и обход страниц"""
+        async with self._stages():
+            await super().request_site()
+
+    async def retry_dead_letters(self):
+        async with self._stages():
+            await super().retry_dead_letters()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Парсер бюллетеней в режиме конвейера")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d"),
+                        default=datetime(2023, 1, 1), help="минимальная дата бюллетеня, ГГГГ-ММ-ДД")
+    parser.add_argument("--max-pages", type=int, default=100)
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--page-concurrency", type=int, default=3)
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS)
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--write-batch-size", type=int, default=WRITE_BATCH_SIZE)
+    parser.add_argument("--cache-dir", help="каталог локального кэша страниц и XLS")
+    parser.add_argument("--offline", action="store_true", help="работать только с локальным кэшем")
+    parser.add_argument("--dead-letters", help="JSON-файл для URL, которые не удалось загрузить")
+    parser.add_argument("--retry-dead-letters", action="store_true",
+                        help="повторить URL из файла --dead-letters вместо обхода страниц")
+    parser.add_argument("--max-concurrency", type=int, help="верхняя граница адаптивного параллелизма")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    pipeline = PipelineParserTrade(
+        max_pages=args.max_pages,
+        min_date=args.since,
+        cache_dir=args.cache_dir,
+        offline=args.offline,
+        dead_letters_path=args.dead_letters,
+        max_concurrency=args.max_concurrency,
+        incremental=args.incremental,
+        concurrency=args.page_concurrency,
+        download_workers=args.download_workers,
+        parse_workers=args.parse_workers,
+        queue_size=args.queue_size,
+        write_batch_size=args.write_batch_size,
+    )
+    asyncio.run(pipeline.run(retry_dead_letters=args.retry_dead_letters))
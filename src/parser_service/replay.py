@@ -0,0 +1,123 @@
+"""Запись страниц и бюллетеней spimex и их воспроизведение локальным сервером.
+
+Запись:
+    python -m parser_service.replay record --fixtures fixtures/spimex --max-pages 5
+
+Воспроизведение:
+    python -m parser_service.replay serve --fixtures fixtures/spimex --port 8080 \\
+        --latency 0.05 --error-rate 0.1
+
+После этого парсер можно направить на локальный сервер:
+    ParserTrade(base_url="http://localhost:8080")
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from pathlib import Path
+
+from aiohttp import web
+from yarl import URL
+
+from parser_service.parser import ParserTrade
+
+MANIFEST = "manifest.json"
+
+
+def _content_type(url):
+    return "application/vnd.ms-excel" if "oil_xls" in url else "text/html; charset=utf-8"
+
+
+class RecordingParserTrade(ParserTrade):
+    """Парсер, который сохраняет все ответы сайта в каталог фикстур, не трогая БД"""
+
+    def __init__(self, fixtures_dir, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fixtures_dir = Path(fixtures_dir)
+        (self.fixtures_dir / "files").mkdir(parents=True, exist_ok=True)
+        self.manifest = {}
+
+    async def fetch(self, url, session=None, date=None):
+        content = await super().fetch(url, session, date)
+        if content is not None:
+            path = URL(url).raw_path_qs
+            name = f"files/{hashlib.sha256(path.encode()).hexdigest()}"
+            (self.fixtures_dir / name).write_bytes(content)
+            self.manifest[path] = {"file": name, "content_type": _content_type(url)}
+        return content
+
+    async def _handle_link(self, url, date):
+        await self.download_xls(url, date=date)
+
+    async def run(self):
+        async with self:
+            await self.request_site()
+        with open(self.fixtures_dir / MANIFEST, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        print(f"Записано ответов: {len(self.manifest)} в {self.fixtures_dir}")
+
+
+def create_replay_app(fixtures_dir, latency=0.0, error_rate=0.0, error_status=503, seed=None):
+    """Создаёт aiohttp-приложение, которое отдаёт записанные ответы.
+
+    latency - задержка каждого ответа в секундах, error_rate - доля запросов,
+    на которые сервер отвечает error_status.
+    """
+    fixtures_dir = Path(fixtures_dir)
+    with open(fixtures_dir / MANIFEST, encoding="utf-8") as f:
+        manifest = json.load(f)
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0, "not_found": 0}
+
+    async def handler(request):
+        stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if error_rate and rng.random() < error_rate:
+            stats["errors"] += 1
+            return web.Response(status=error_status)
+
+        entry = manifest.get(request.raw_path)
+        if entry is None:
+            stats["not_found"] += 1
+            return web.Response(status=404)
+        return web.Response(
+            body=(fixtures_dir / entry["file"]).read_bytes(),
+            headers={"Content-Type": entry["content_type"]},
+        )
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_route("GET", "/{tail:.*}", handler)
+    return app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Запись и воспроизведение ответов spimex")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="записать страницы и XLS в каталог фикстур")
+    record.add_argument("--fixtures", required=True)
+    record.add_argument("--max-pages", type=int, default=5)
+    record.add_argument("--base-url", default="https://spimex.com")
+
+    serve = commands.add_parser("serve", help="запустить локальный сервер с записанными ответами")
+    serve.add_argument("--fixtures", required=True)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--latency", type=float, default=0.0, help="задержка ответа, секунды")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="доля ответов с ошибкой, 0..1")
+    serve.add_argument("--error-status", type=int, default=503)
+    serve.add_argument("--seed", type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "record":
+        recorder = RecordingParserTrade(args.fixtures, max_pages=args.max_pages, base_url=args.base_url)
+        asyncio.run(recorder.run())
+    else:
+        app = create_replay_app(args.fixtures, args.latency, args.error_rate, args.error_status, args.seed)
+        web.run_app(app, host=args.host, port=args.port)
@@ -0,0 +1,70 @@
+import asyncio
+import random
+
+# Ответы, после которых запрос повторяется, а параллелизм снижается
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AdaptiveLimiter:
+    """Ограничитель параллельных запросов с AIMD-регулировкой лимита.
+
+    Каждый успешный запрос увеличивает лимит на 1/limit (то есть на единицу за
+    «окно» из limit успешных запросов), сигнал перегрузки сайта уменьшает его вдвое,
+    но не чаще раза за окно: ошибки запросов, отправленных до снижения, сообщают о той
+    же перегрузке и лимит повторно не снижают.
+    """
+
+    def __init__(self, limit, min_limit=1, max_limit=None):
+        self.max_limit = max_limit or limit
+        self.min_limit = min_limit
+        self.limit = float(min(limit, self.max_limit))
+        self.in_flight = 0
+        # Номер последнего запущенного запроса и последнего запроса, отправленного до снижения
+        self.sent = 0
+        self._recovery = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            self.sent += 1
+            return self.sent
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self, request=None):
+        """Снижает лимит; request - номер запроса из `async with limiter as request`"""
+        if request is not None and request <= self._recovery:
+            return
+        self._recovery = self.sent
+        self.limit = max(self.min_limit, self.limit / 2)
+
+
+class RetryPolicy:
+    """Повторы с экспоненциальной задержкой и случайным разбросом (full jitter)"""
+
+    def __init__(self, attempts=4, base_delay=0.5, max_delay=30.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        """Задержка перед попыткой attempt (нумерация с 1 для первого повтора)"""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    """Читает заголовок Retry-After в секундах, дату в заголовке не поддерживаем"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
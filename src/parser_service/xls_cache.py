@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import aiofiles
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class XlsCache:
+    """Локальный кэш скачанных файлов.
+
+    Содержимое хранится по хэшу в objects/, а index/ связывает URL
+    с хэшем содержимого и заголовками ETag/Last-Modified для условных запросов.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.objects_dir = self.directory / "objects"
+        self.index_dir = self.directory / "index"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+    def _index_path(self, url):
+        return self.index_dir / f"{_sha256(url.encode())}.json"
+
+    def _object_path(self, digest):
+        return self.objects_dir / f"{digest}.xls"
+
+    async def get(self, url):
+        """Возвращает запись кэша для URL или None"""
+        path = self._index_path(url)
+        if not path.exists():
+            return None
+        async with aiofiles.open(path, "r", encoding="utf-8") as f:
+            entry = json.loads(await f.read())
+        if not self._object_path(entry["sha256"]).exists():
+            return None
+        return entry
+
+    async def read(self, entry):
+        """Читает содержимое записи кэша"""
+        async with aiofiles.open(self._object_path(entry["sha256"]), "rb") as f:
+            return await f.read()
+
+    async def put(self, url, content, etag=None, last_modified=None):
+        """Сохраняет содержимое и заголовки ответа для URL"""
+        digest = _sha256(content)
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            await self._write_atomic(object_path, content)
+
+        entry = {
+            "url": url,
+            "sha256": digest,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": datetime.now().isoformat(),
+        }
+        await self._write_atomic(self._index_path(url), json.dumps(entry, ensure_ascii=False).encode())
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Заголовки условного запроса по сохранённой записи"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    async def _write_atomic(path, data):
+        # Пишем во временный файл и переименовываем, чтобы не оставить обрезанный файл
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(data)
+        os.replace(tmp_path, path)
@@ -0,0 +1,72 @@
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import NullPool
+
+load_dotenv()
+
+# Общая декларативная база для моделей API и парсера
+Base = declarative_base()
+# База для представлений: их создают миграции, autogenerate их не сравнивает
+ViewBase = declarative_base()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Реплика только для чтения: на неё API отправляет запросы эндпоинтов, если она задана
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+
+def env_flag(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Логирование каждого SQL-запроса: только для отладки
+DB_ECHO = env_flag("DB_ECHO", False)
+# Пул соединений на процесс: постоянные соединения и сколько можно открыть сверх них
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Ожидание свободного соединения и время жизни соединения, секунды
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Проверка соединения перед выдачей из пула: переживает перезапуск БД
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)
+# Подготовленных запросов asyncpg на соединение; 0 - для PgBouncer в режиме транзакций
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+
+def engine_options(url, **overrides):
+    """Параметры create_async_engine из переменных окружения"""
+    options = {
+        "echo": DB_ECHO,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        connect_args = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+        if not DB_STATEMENT_CACHE_SIZE:
+            # Без кэша SQLAlchemy отключаем и собственный кэш asyncpg
+            connect_args["statement_cache_size"] = 0
+        options["connect_args"] = connect_args
+    options.update(overrides)
+    if options.get("poolclass") is NullPool:
+        for name in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle"):
+            options.pop(name, None)
+    return options
+
+
+def create_engine(url=None, **overrides):
+    """Асинхронный движок с настройками пула из окружения"""
+    url = url or DATABASE_URL
+    return create_async_engine(url, **engine_options(url, **overrides))
+
+
+def create_sessionmaker(engine):
+    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
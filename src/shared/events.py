@@ -0,0 +1,37 @@
+"""Событие о завершении загрузки торгов для сброса кэша API.
+
+Парсер отправляет одно уведомление Postgres NOTIFY в конце запуска, когда все
+загруженные данные уже зафиксированы. Версия в уведомлении становится новым
+пространством ключей кэша во всех процессах API.
+"""
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+INGEST_CHANNEL = "ingest_completed"
+
+
+def ingest_payload(dates, version=None):
+    """Тело уведомления: диапазон загруженных дат и новая версия кэша.
+
+    Передаётся диапазон, а не список дат: размер уведомления в Postgres ограничен.
+    """
+    dates = sorted((day.date() if isinstance(day, datetime) else day).isoformat() for day in dates)
+    return json.dumps({
+        "version": version or uuid.uuid4().hex,
+        "start": dates[0] if dates else None,
+        "end": dates[-1] if dates else None,
+    })
+
+
+def parse_ingest_payload(payload):
+    """Возвращает (версия, первая дата, последняя дата) из тела уведомления"""
+    data = json.loads(payload)
+    return data["version"], data.get("start"), data.get("end")
+
+
+def ingest_notify_stmt(dates):
+    """Запрос pg_notify: уведомление уходит слушателям после COMMIT"""
+    return select(func.pg_notify(INGEST_CHANNEL, ingest_payload(dates)))
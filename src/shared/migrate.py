@@ -0,0 +1,20 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+
+def alembic_config(connection=None):
+    """Конфигурация Alembic, не зависящая от текущего каталога"""
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def upgrade(connection, revision="head"):
+    """Применяет миграции на переданном синхронном соединении (через AsyncConnection.run_sync)"""
+    command.upgrade(alembic_config(connection), revision)
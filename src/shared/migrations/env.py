@@ -0,0 +1,65 @@
+import asyncio
+import os
+from logging.config import fileConfig
+
+from alembic import context
+from dotenv import load_dotenv
+from sqlalchemy.pool import NullPool
+
+from shared.database import Base, create_engine
+from shared.partitioning import is_partition_table
+import shared.models  # noqa: F401  регистрирует модели в Base.metadata
+
+load_dotenv()
+
+if context.config.config_file_name is not None:
+    fileConfig(context.config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_name(name, type_, parent_names):
+    # Помесячные секции parsed_data создаются парсером, а не миграциями
+    return not (type_ == "table" and is_partition_table(name))
+
+
+def run_migrations_offline():
+    """Генерирует SQL без подключения к БД (alembic upgrade --sql)"""
+    context.configure(
+        url=os.getenv("DATABASE_URL"),
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection):
+    context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations():
+    engine = create_engine(os.getenv("DATABASE_URL"), poolclass=NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+        await connection.commit()
+    await engine.dispose()
+
+
+def run_migrations_online():
+    # Парсер передаёт своё соединение через config.attributes (см. shared.migrate)
+    connection = context.config.attributes.get("connection")
+    if connection is None:
+        asyncio.run(run_async_migrations())
+    else:
+        do_run_migrations(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,54 @@
+"""Таблица parsed_data с уникальным ключом (exchange_product_id, date)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("parsed_data"):
+        op.create_table(
+            "parsed_data",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("exchange_product_id", sa.String, nullable=True),
+            sa.Column("exchange_product_name", sa.String, nullable=True),
+            sa.Column("oil_id", sa.String, nullable=True),
+            sa.Column("delivery_basis_id", sa.String, nullable=True),
+            sa.Column("delivery_basis_name", sa.String, nullable=True),
+            sa.Column("delivery_type_id", sa.String, nullable=True),
+            sa.Column("volume", sa.Integer, nullable=True),
+            sa.Column("total", sa.Integer, nullable=True),
+            sa.Column("count", sa.Integer, nullable=True),
+            sa.Column("date", sa.Date, nullable=True),
+            sa.Column("created_on", sa.Date, nullable=True),
+            sa.Column("updated_on", sa.Date, nullable=True),
+            sa.UniqueConstraint("exchange_product_id", "date", name="uq_parsed_data_product_date"),
+        )
+        return
+
+    # Таблица создана раньше через create_all: удаляем дубликаты и добавляем ключ
+    constraints = {c["name"] for c in inspector.get_unique_constraints("parsed_data")}
+    if "uq_parsed_data_product_date" not in constraints:
+        op.execute(
+            "DELETE FROM parsed_data a USING parsed_data b "
+            "WHERE a.id < b.id "
+            "AND a.exchange_product_id = b.exchange_product_id "
+            "AND a.date = b.date"
+        )
+        op.create_unique_constraint(
+            "uq_parsed_data_product_date", "parsed_data", ["exchange_product_id", "date"]
+        )
+
+
+def downgrade():
+    op.drop_table("parsed_data")
@@ -0,0 +1,28 @@
+"""Индексы под запросы /trading
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /last_dates (DISTINCT date ORDER BY date DESC) и /results (date = последняя дата + фильтры)
+    op.create_index(
+        "ix_parsed_data_date_filters",
+        "parsed_data",
+        ["date", "oil_id", "delivery_type_id", "delivery_basis_id"],
+    )
+    # /dynamics: oil_id = ... AND date BETWEEN ...
+    op.create_index("ix_parsed_data_oil_date", "parsed_data", ["oil_id", "date"])
+
+
+def downgrade():
+    op.drop_index("ix_parsed_data_oil_date", table_name="parsed_data")
+    op.drop_index("ix_parsed_data_date_filters", table_name="parsed_data")
@@ -0,0 +1,31 @@
+"""Справочник торговых дат trading_dates
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "trading_dates",
+        sa.Column("date", sa.Date, primary_key=True),
+        sa.Column("row_count", sa.Integer, nullable=False),
+        sa.Column("ingested_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO trading_dates (date, row_count, ingested_at) "
+        "SELECT date, count(*), now() FROM parsed_data "
+        "WHERE date IS NOT NULL GROUP BY date"
+    )
+
+
+def downgrade():
+    op.drop_table("trading_dates")
@@ -0,0 +1,23 @@
+"""Дата торгов parsed_data обязательна: по ней секционируется таблица
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Строки без даты не относятся ни к одному бюллетеню и не видны в /trading
+    op.execute("DELETE FROM parsed_data WHERE date IS NULL")
+    op.alter_column("parsed_data", "date", existing_type=sa.Date, nullable=False)
+
+
+def downgrade():
+    op.alter_column("parsed_data", "date", existing_type=sa.Date, nullable=True)
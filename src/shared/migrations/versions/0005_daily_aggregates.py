@@ -0,0 +1,38 @@
+"""Дневные агрегаты торгов daily_aggregates для /trading/aggregates
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "daily_aggregates",
+        sa.Column("date", sa.Date, primary_key=True),
+        sa.Column("oil_id", sa.String, primary_key=True),
+        sa.Column("delivery_basis_id", sa.String, primary_key=True),
+        sa.Column("delivery_type_id", sa.String, primary_key=True),
+        sa.Column("volume", sa.BigInteger, nullable=False),
+        sa.Column("total", sa.BigInteger, nullable=False),
+        sa.Column("count", sa.BigInteger, nullable=False),
+        sa.Column("row_count", sa.Integer, nullable=False),
+    )
+    op.execute(
+        "INSERT INTO daily_aggregates (date, oil_id, delivery_basis_id, delivery_type_id, "
+        "volume, total, count, row_count) "
+        "SELECT date, coalesce(oil_id, ''), coalesce(delivery_basis_id, ''), coalesce(delivery_type_id, ''), "
+        "coalesce(sum(volume), 0), coalesce(sum(total), 0), coalesce(sum(count), 0), count(*) "
+        "FROM parsed_data GROUP BY 1, 2, 3, 4"
+    )
+
+
+def downgrade():
+    op.drop_table("daily_aggregates")
@@ -0,0 +1,89 @@
+"""Компактное хранение parsed_data: коды фиксированной длины, справочники названий, BIGINT
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Прежняя форма parsed_data для API и внешних запросов
+VIEW_SQL = """
+CREATE VIEW parsed_data_view AS
+SELECT d.id, d.exchange_product_id, p.exchange_product_name, d.oil_id, d.delivery_basis_id,
+       b.delivery_basis_name, d.delivery_type_id, d.volume, d.total, d.count, d.date,
+       d.created_on, d.updated_on
+FROM parsed_data d
+LEFT JOIN products p ON p.exchange_product_id = d.exchange_product_id
+LEFT JOIN delivery_bases b ON b.delivery_basis_id = d.delivery_basis_id
+"""
+
+
+def upgrade():
+    op.create_table(
+        "products",
+        sa.Column("exchange_product_id", sa.CHAR(11), primary_key=True),
+        sa.Column("exchange_product_name", sa.String, nullable=False),
+    )
+    op.create_table(
+        "delivery_bases",
+        sa.Column("delivery_basis_id", sa.CHAR(3), primary_key=True),
+        sa.Column("delivery_basis_name", sa.String, nullable=False),
+    )
+    # Для каждого кода берём название из последнего бюллетеня
+    op.execute(
+        "INSERT INTO products (exchange_product_id, exchange_product_name) "
+        "SELECT DISTINCT ON (exchange_product_id) exchange_product_id, exchange_product_name FROM parsed_data "
+        "WHERE exchange_product_id IS NOT NULL AND exchange_product_name IS NOT NULL "
+        "ORDER BY exchange_product_id, date DESC"
+    )
+    op.execute(
+        "INSERT INTO delivery_bases (delivery_basis_id, delivery_basis_name) "
+        "SELECT DISTINCT ON (delivery_basis_id) delivery_basis_id, delivery_basis_name FROM parsed_data "
+        "WHERE delivery_basis_id IS NOT NULL AND delivery_basis_name IS NOT NULL "
+        "ORDER BY delivery_basis_id, date DESC"
+    )
+
+    op.drop_column("parsed_data", "exchange_product_name")
+    op.drop_column("parsed_data", "delivery_basis_name")
+    # Все изменения типов одной командой: таблица и индексы перезаписываются один раз
+    op.execute(
+        "ALTER TABLE parsed_data "
+        "ALTER COLUMN exchange_product_id TYPE CHAR(11), "
+        "ALTER COLUMN oil_id TYPE CHAR(4), "
+        "ALTER COLUMN delivery_basis_id TYPE CHAR(3), "
+        "ALTER COLUMN delivery_type_id TYPE CHAR(1), "
+        "ALTER COLUMN volume TYPE BIGINT, "
+        "ALTER COLUMN total TYPE BIGINT"
+    )
+    op.execute(VIEW_SQL)
+
+
+def downgrade():
+    op.execute("DROP VIEW parsed_data_view")
+    op.execute(
+        "ALTER TABLE parsed_data "
+        "ALTER COLUMN exchange_product_id TYPE VARCHAR, "
+        "ALTER COLUMN oil_id TYPE VARCHAR, "
+        "ALTER COLUMN delivery_basis_id TYPE VARCHAR, "
+        "ALTER COLUMN delivery_type_id TYPE VARCHAR, "
+        "ALTER COLUMN volume TYPE INTEGER, "
+        "ALTER COLUMN total TYPE INTEGER, "
+        "ADD COLUMN exchange_product_name VARCHAR, "
+        "ADD COLUMN delivery_basis_name VARCHAR"
+    )
+    op.execute(
+        "UPDATE parsed_data d SET exchange_product_name = p.exchange_product_name "
+        "FROM products p WHERE p.exchange_product_id = d.exchange_product_id"
+    )
+    op.execute(
+        "UPDATE parsed_data d SET delivery_basis_name = b.delivery_basis_name "
+        "FROM delivery_bases b WHERE b.delivery_basis_id = d.delivery_basis_id"
+    )
+    op.drop_table("delivery_bases")
+    op.drop_table("products")
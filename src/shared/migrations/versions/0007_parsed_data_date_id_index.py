@@ -0,0 +1,21 @@
+"""Индекс (date, id) под постраничную выдачу /trading/dynamics
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /dynamics: ORDER BY date, id и курсор (date, id) > (...) читаются по индексу без сортировки
+    op.create_index("ix_parsed_data_date_id", "parsed_data", ["date", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_parsed_data_date_id", table_name="parsed_data")
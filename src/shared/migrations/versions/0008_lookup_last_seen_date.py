@@ -0,0 +1,37 @@
+"""Дата бюллетеня, из которого взято название в справочниках продуктов и базисов
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Справочник, поле кода
+LOOKUPS = (
+    ("products", "exchange_product_id"),
+    ("delivery_bases", "delivery_basis_id"),
+)
+
+
+def upgrade():
+    for table, code in LOOKUPS:
+        op.add_column(table, sa.Column("last_seen_date", sa.Date, nullable=True))
+        # Миграция 0006 взяла названия из последнего бюллетеня с этим кодом
+        op.execute(
+            f"UPDATE {table} t SET last_seen_date = d.last_date "
+            f"FROM (SELECT {code}, max(date) AS last_date FROM parsed_data GROUP BY {code}) d "
+            f"WHERE d.{code} = t.{code}"
+        )
+        op.execute(f"UPDATE {table} SET last_seen_date = DATE '1970-01-01' WHERE last_seen_date IS NULL")
+        op.alter_column(table, "last_seen_date", nullable=False)
+
+
+def downgrade():
+    for table, _ in LOOKUPS:
+        op.drop_column(table, "last_seen_date")
@@ -0,0 +1,133 @@
+from sqlalchemy import CHAR, BigInteger, Column, Integer, String, Date, DateTime, Index, UniqueConstraint
+from shared.database import Base, ViewBase
+
+
+class ParsedData(Base):
+    __tablename__ = 'parsed_data'
+    __table_args__ = (
+        UniqueConstraint("exchange_product_id", "date", name="uq_parsed_data_product_date"),
+        # /trading/results и /trading/last_dates: равенство или сортировка по дате + фильтры
+        Index("ix_parsed_data_date_filters", "date", "oil_id", "delivery_type_id", "delivery_basis_id"),
+        # /trading/dynamics: фильтр по oil_id и диапазон дат
+        Index("ix_parsed_data_oil_date", "oil_id", "date"),
+        # /trading/dynamics и /trading/export: порядок (date, id) и курсор страницы
+        Index("ix_parsed_data_date_id", "date", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # Коды фиксированной длины: срезы exchange_product_id (4, 3 и 1 символ)
+    exchange_product_id = Column(CHAR(11), nullable=True)
+    oil_id = Column(CHAR(4), nullable=True)
+    delivery_basis_id = Column(CHAR(3), nullable=True)
+    delivery_type_id = Column(CHAR(1), nullable=True)
+    volume = Column(BigInteger, nullable=True)
+    total = Column(BigInteger, nullable=True)
+    count = Column(Integer, nullable=True)
+    date = Column(Date, nullable=False)
+    created_on = Column(Date, nullable=True)
+    updated_on = Column(Date, nullable=True)
+
+
+class Product(Base):
+    """Справочник названий продуктов по коду инструмента"""
+    __tablename__ = 'products'
+
+    exchange_product_id = Column(CHAR(11), primary_key=True)
+    exchange_product_name = Column(String, nullable=False)
+    # Дата бюллетеня, из которого взято название: более старые бюллетени его не перезаписывают
+    last_seen_date = Column(Date, nullable=False)
+
+
+class DeliveryBasis(Base):
+    """Справочник названий базисов поставки"""
+    __tablename__ = 'delivery_bases'
+
+    delivery_basis_id = Column(CHAR(3), primary_key=True)
+    delivery_basis_name = Column(String, nullable=False)
+    last_seen_date = Column(Date, nullable=False)
+
+
+# Определение представления; миграция 0006 хранит свою копию
+TRADING_RESULT_VIEW_SQL = """
+CREATE VIEW parsed_data_view AS
+SELECT d.id, d.exchange_product_id, p.exchange_product_name, d.oil_id, d.delivery_basis_id,
+       b.delivery_basis_name, d.delivery_type_id, d.volume, d.total, d.count, d.date,
+       d.created_on, d.updated_on
+FROM parsed_data d
+LEFT JOIN products p ON p.exchange_product_id = d.exchange_product_id
+LEFT JOIN delivery_bases b ON b.delivery_basis_id = d.delivery_basis_id
+"""
+
+
+class TradingResult(ViewBase):
+    """Строки торгов в прежней форме parsed_data: с названиями из справочников.
+
+    Представление parsed_data_view создаётся миграцией 0006, API читает только из него.
+    Названия в строках текущие, из самого свежего бюллетеня с этим кодом, а не из
+    бюллетеня самой строки.
+    """
+    __tablename__ = 'parsed_data_view'
+
+    id = Column(Integer, primary_key=True)
+    exchange_product_id = Column(CHAR(11))
+    exchange_product_name = Column(String)
+    oil_id = Column(CHAR(4))
+    delivery_basis_id = Column(CHAR(3))
+    delivery_basis_name = Column(String)
+    delivery_type_id = Column(CHAR(1))
+    volume = Column(BigInteger)
+    total = Column(BigInteger)
+    count = Column(Integer)
+    date = Column(Date)
+    created_on = Column(Date)
+    updated_on = Column(Date)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "exchange_product_id": self.exchange_product_id,
+            "exchange_product_name": self.exchange_product_name,
+            "oil_id": self.oil_id,
+            "delivery_basis_id": self.delivery_basis_id,
+            "delivery_basis_name": self.delivery_basis_name,
+            "delivery_type_id": self.delivery_type_id,
+            "volume": self.volume,
+            "total": self.total,
+            "count": self.count,
+            "date": self.date.isoformat() if self.date else None,
+            "created_on": self.created_on.isoformat() if self.created_on else None,
+            "updated_on": self.updated_on.isoformat() if self.updated_on else None,
+        }
+
+
+class TradingDate(Base):
+    """Торговые даты, за которые загружен бюллетень: число строк и время загрузки"""
+    __tablename__ = 'trading_dates'
+
+    date = Column(Date, primary_key=True)
+    row_count = Column(Integer, nullable=False)
+    ingested_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class DailyAggregate(Base):
+    """Суммы торгов за день по виду нефтепродукта, базису и типу поставки"""
+    __tablename__ = 'daily_aggregates'
+
+    date = Column(Date, primary_key=True)
+    oil_id = Column(String, primary_key=True)
+    delivery_basis_id = Column(String, primary_key=True)
+    delivery_type_id = Column(String, primary_key=True)
+    volume = Column(BigInteger, nullable=False)
+    total = Column(BigInteger, nullable=False)
+    count = Column(BigInteger, nullable=False)
+    row_count = Column(Integer, nullable=False)
+
+
+# Измерения агрегатов: пустая строка вместо NULL, так как они входят в первичный ключ
+AGGREGATE_DIMENSIONS = ("oil_id", "delivery_basis_id", "delivery_type_id")
+
+
+# Естественный ключ бюллетеня: один продукт за одну торговую дату
+UNIQUE_KEY = next(
+    c for c in ParsedData.__table__.constraints if isinstance(c, UniqueConstraint)
+)
@@ -0,0 +1,157 @@
+"""Помесячное секционирование parsed_data по дате торгов (необязательное).
+
+Перевод существующей таблицы на секции:
+    python -m shared.partitioning migrate
+
+После перевода парсер сам создаёт секции на PARTITIONS_AHEAD месяцев вперёд
+при запуске и секции под даты каждого загружаемого бюллетеня.
+"""
+import argparse
+import asyncio
+import re
+from datetime import date
+
+from sqlalchemy import text
+
+from shared.models import TRADING_RESULT_VIEW_SQL
+
+TABLE = "parsed_data"
+
+# Сколько месяцев вперёд создавать секции при запуске парсера
+PARTITIONS_AHEAD = 3
+
+PARTITION_NAME = re.compile(rf"^{TABLE}_y\d{{4}}m\d{{2}}$")
+
+IS_PARTITIONED_SQL = (
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+    "JOIN pg_class c ON c.oid = p.partrelid "
+    f"WHERE c.relname = '{TABLE}' AND pg_table_is_visible(c.oid))"
+)
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def months_between(start, end):
+    """Первые числа месяцев от месяца start до месяца end включительно"""
+    month, last = month_start(start), month_start(end)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def months_ahead(day, ahead=PARTITIONS_AHEAD):
+    """Месяц day и ahead следующих месяцев"""
+    last = month_start(day)
+    for _ in range(ahead):
+        last = next_month(last)
+    return list(months_between(day, last))
+
+
+def partition_name(month):
+    return f"{TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_ddl(month):
+    """DDL секции за месяц, безопасный для повторного выполнения"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+    )
+
+
+def partition_lock_sql(month):
+    """Блокировка создания секции до конца транзакции.
+
+    CREATE TABLE IF NOT EXISTS ... PARTITION OF из двух транзакций одновременно
+    падает с ошибкой duplicate relation: вторая транзакция ждёт блокировку и
+    после COMMIT первой видит готовую секцию.
+    """
+    return f"SELECT pg_advisory_xact_lock(hashtext('{partition_name(month)}'))"
+
+
+def is_partition_table(name):
+    return bool(PARTITION_NAME.match(name))
+
+
+def is_partitioned(conn):
+    """Проверяет, секционирована ли parsed_data (синхронное соединение)"""
+    return conn.execute(text(IS_PARTITIONED_SQL)).scalar()
+
+
+def convert_to_partitioned(conn, ahead=PARTITIONS_AHEAD):
+    """Переводит parsed_data на помесячные секции, перенося данные.
+
+    Выполняется в одной транзакции на синхронном соединении после миграций.
+    """
+    if is_partitioned(conn):
+        print("parsed_data уже секционирована")
+        return
+
+    old = f"{TABLE}_unpartitioned"
+    # Представление ссылается на таблицу: пересоздаём его поверх новой
+    conn.execute(text("DROP VIEW IF EXISTS parsed_data_view"))
+    conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {old}"))
+    # Имена индексов уникальны в схеме: освобождаем их для новой таблицы
+    for index in conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"
+    ), {"table": old}).scalars().all():
+        conn.execute(text(f"ALTER INDEX {index} RENAME TO {index}_old"))
+    conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY NONE"))
+
+    conn.execute(text(f"""
+        CREATE TABLE {TABLE} (
+            id INTEGER NOT NULL DEFAULT nextval('{TABLE}_id_seq'),
+            exchange_product_id CHAR(11),
+            oil_id CHAR(4),
+            delivery_basis_id CHAR(3),
+            delivery_type_id CHAR(1),
+            volume BIGINT,
+            total BIGINT,
+            count INTEGER,
+            date DATE NOT NULL,
+            created_on DATE,
+            updated_on DATE,
+            CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, date),
+            CONSTRAINT uq_parsed_data_product_date UNIQUE (exchange_product_id, date)
+        ) PARTITION BY RANGE (date)
+    """))
+    conn.execute(text(
+        f"CREATE INDEX ix_parsed_data_date_filters ON {TABLE} "
+        "(date, oil_id, delivery_type_id, delivery_basis_id)"
+    ))
+    conn.execute(text(f"CREATE INDEX ix_parsed_data_oil_date ON {TABLE} (oil_id, date)"))
+    conn.execute(text(f"CREATE INDEX ix_parsed_data_date_id ON {TABLE} (date, id)"))
+    conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id"))
+
+    first, last = conn.execute(text(f"SELECT min(date), max(date) FROM {old}")).one()
+    upcoming = months_ahead(date.today(), ahead)
+    for month in months_between(min(first or upcoming[0], upcoming[0]), max(last or upcoming[-1], upcoming[-1])):
+        conn.execute(text(partition_ddl(month)))
+
+    moved = conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {old}")).rowcount
+    conn.execute(text(f"DROP TABLE {old}"))
+    conn.execute(text(TRADING_RESULT_VIEW_SQL))
+    print(f"Перенесено {moved} строк в секционированную parsed_data")
+
+
+async def migrate():
+    from shared.migrate import upgrade
+    from parser_service.database import engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade)
+        await conn.run_sync(convert_to_partitioned)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Помесячное секционирование parsed_data")
+    arg_parser.add_argument("command", choices=["migrate"])
+    arg_parser.parse_args()
+    asyncio.run(migrate())
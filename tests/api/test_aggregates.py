@@ -0,0 +1,43 @@
+from datetime import date
+from types import SimpleNamespace
+import pytest
+from api_service.routers.trading import generate_cache_key
+
+
+@pytest.mark.asyncio
+async def test_get_aggregates_by_month_and_oil(client, mock_db_session, mock_redis, as_row):
+    """Суммы по месяцам с группировкой по виду нефтепродукта"""
+    mock_result = mock_db_session.execute.return_value
+    mock_result.all.return_value = [
+        as_row(
+            SimpleNamespace(period=date(2023, 10, 1), oil_id="OIL001", volume=1500, total=4_000_000_000, count=3),
+            ("period", "oil_id", "volume", "total", "count"), key=(),
+        ),
+    ]
+
+    response = client.get("/trading/aggregates", params={"granularity": "month", "group_by": "oil_id"})
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"period": "2023-10-01", "oil_id": "OIL001", "delivery_basis_id": None, "delivery_type_id": None,
+         "volume": 1500, "total": 4_000_000_000, "count": 3},
+    ]
+
+    # Запрос идёт к дневным агрегатам, а не к таблице торгов
+    query = mock_db_session.execute.call_args[0][0]
+    compiled = str(query.compile())
+    assert "FROM daily_aggregates" in compiled
+    assert "parsed_data" not in compiled
+    assert "GROUP BY" in compiled and "daily_aggregates.oil_id" in compiled
+    assert query.compile().params["date_trunc_1"] == "month"
+
+    mock_redis.setex.assert_called_once()
+    assert mock_redis.setex.call_args[0][0] == generate_cache_key(
+        "aggregates", granularity="month", group_by=["oil_id"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_aggregates_rejects_unknown_granularity_and_group(client):
+    assert client.get("/trading/aggregates", params={"granularity": "year"}).status_code == 422
+    assert client.get("/trading/aggregates", params={"group_by": "exchange_product_id"}).status_code == 422
@@ -0,0 +1,41 @@
+from datetime import date
+import pytest
+from api_service import cache_codec
+from api_service.cache_codec import CacheCodec
+from api_service.routers.trading import generate_cache_key
+
+
+def test_cache_key_is_canonical():
+    key = generate_cache_key("dynamics", oil_id="A001", start_date=date(2024, 1, 1), delivery_type_id=None)
+
+    # Порядок параметров и пустые значения не меняют ключ
+    assert key == generate_cache_key("dynamics", start_date=date(2024, 1, 1), delivery_basis_id="", oil_id="A001")
+    assert key != generate_cache_key("dynamics", oil_id="A002", start_date=date(2024, 1, 1))
+    assert key.startswith("v1:dynamics:")
+    assert len(key) == len("v1:dynamics:") + 32
+
+
+@pytest.mark.parametrize("codec", cache_codec.available_codecs())
+def test_codec_roundtrip(codec):
+    value = b'[{"oil_id":"A001","volume":100}]' * 200
+    codec = CacheCodec(codec, min_bytes=1024)
+
+    encoded = codec.encode(value)
+
+    assert len(encoded) < len(value) / 10
+    assert codec.decode(encoded) == value
+
+
+def test_codec_keeps_small_values_raw():
+    codec = CacheCodec("zlib", min_bytes=1024)
+
+    assert codec.encode(b'{"dates":[]}') == b'\x00{"dates":[]}'
+    assert codec.decode(b'\x00{"dates":[]}') == b'{"dates":[]}'
+
+
+def test_codec_unknown_value_is_miss(mocker):
+    codec = CacheCodec("zlib")
+    # Значение старого формата и значение кодека, которого нет в процессе
+    assert codec.decode(b'{"dates":[]}') is None
+    mocker.patch.object(cache_codec, "available_codecs", return_value=["zlib"])
+    assert codec.decode(b"Z" + b"\x28\xb5\x2f\xfd") is None
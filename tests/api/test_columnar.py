@@ -0,0 +1,65 @@
+from datetime import date
+import io
+import pytest
+from api_service.models import TradingResult
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+
+@pytest.mark.asyncio
+async def test_dynamics_arrow_with_dictionary(client, mock_db_session, mock_redis, as_row):
+    """Accept: Arrow - страница в Arrow IPC, минуя кэш"""
+    fake_data = [
+        TradingResult(id=i, exchange_product_name="Бензин", volume=i * 10, date=date(2023, 10, i)) for i in (1, 2, 3)
+    ]
+    mock_result = mock_db_session.execute.return_value
+    mock_result.all.return_value = [as_row(item, ("exchange_product_name", "volume")) for item in fake_data]
+
+    response = client.get(
+        "/trading/dynamics",
+        params=[("fields", "exchange_product_name"), ("fields", "volume"), ("fields", "date"),
+                ("limit", 2), ("dictionary", "true")],
+        headers={"Accept": f"{ARROW}, application/json;q=0.5"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ARROW
+    assert "X-Next-Cursor" in response.headers
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.schema.field("exchange_product_name").type == pa.dictionary(pa.int32(), pa.string())
+    assert table.to_pydict() == {
+        "exchange_product_name": ["Бензин", "Бензин"],
+        "volume": [10, 20],
+        "date": [date(2023, 10, 1), date(2023, 10, 2)],
+    }
+    mock_redis.get.assert_not_called()
+    mock_redis.setex.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_export_parquet_row_groups(client, mocker, mock_stream_session):
+    mock_stream_session([[("OIL001", 100)], [("OIL002", None)]])
+
+    response = client.get("/trading/export", params=[("fields", "oil_id"), ("fields", "volume")],
+                          headers={"Accept": PARQUET})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == PARQUET
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.read().to_pydict() == {"oil_id": ["OIL001", "OIL002"], "volume": [100, None]}
+
+
+@pytest.mark.asyncio
+async def test_columnar_without_pyarrow_is_not_acceptable(client, mock_db_session, mocker, as_row):
+    mocker.patch("api_service.columnar.available", return_value=False)
+    mock_db_session.execute.return_value.all.return_value = [as_row(TradingResult(id=1, date=date(2023, 10, 1)))]
+
+    assert client.get("/trading/dynamics", headers={"Accept": ARROW}).status_code == 406
+    assert client.get("/trading/export", params={"format": "parquet"}).status_code == 406
+    # JSON по-прежнему доступен
+    assert client.get("/trading/dynamics").status_code == 200
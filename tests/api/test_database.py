@@ -0,0 +1,87 @@
+from unittest.mock import AsyncMock
+import pytest
+from sqlalchemy.pool import NullPool
+from shared import database
+from shared.database import engine_options
+
+
+def test_engine_options_defaults():
+    options = engine_options("postgresql+asyncpg://user@db/spimex_db")
+
+    assert options["echo"] is False
+    assert options["pool_pre_ping"] is True
+    assert options["pool_size"] == database.DB_POOL_SIZE
+    assert options["connect_args"] == {"prepared_statement_cache_size": database.DB_STATEMENT_CACHE_SIZE}
+
+
+def test_engine_options_disabled_statement_cache(mocker):
+    mocker.patch.object(database, "DB_STATEMENT_CACHE_SIZE", 0)
+
+    options = engine_options("postgresql+asyncpg://user@db/spimex_db")
+
+    assert options["connect_args"] == {"prepared_statement_cache_size": 0, "statement_cache_size": 0}
+
+
+def test_engine_options_null_pool_drops_pool_sizing():
+    options = engine_options("postgresql+asyncpg://user@db/spimex_db", poolclass=NullPool)
+
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options and "max_overflow" not in options
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/trading/last_dates", "/trading/results", "/trading/dynamics",
+                                  "/trading/aggregates"])
+async def test_trading_endpoints_load_through_read_session(client, mock_db_session, path):
+    from api_service.routers import trading
+
+    mock_db_session.execute.return_value.all.return_value = []
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
+
+    response = client.get(path)
+
+    # Промах кэша читает данные в сессии ReadSessionLocal, а не в сессии запроса
+    assert response.status_code == 200
+    trading.ReadSessionLocal.assert_called_once_with()
+    mock_db_session.execute.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_cache_loads_open_their_own_read_session(mocker):
+    from api_service.local_cache import LocalCache, TwoTierCache
+    from api_service.routers.trading import in_session
+
+    session = AsyncMock()
+    session_cm = AsyncMock()
+    session_cm.__aenter__.return_value = session
+    factory = mocker.patch("api_service.routers.trading.ReadSessionLocal", return_value=session_cm)
+    load = AsyncMock(return_value=b"body")
+
+    # Загрузку ждут несколько запросов: сессия не берётся из запроса, открывается и закрывается своя
+    assert await in_session(TwoTierCache(LocalCache(), AsyncMock()), load)() == b"body"
+    factory.assert_called_once_with()
+    load.assert_awaited_once_with(session)
+    session_cm.__aexit__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cache_fills_read_primary_right_after_version_switch(mocker):
+    from api_service.local_cache import LocalCache, TwoTierCache
+    from api_service.routers import trading
+
+    mocker.patch.object(trading, "DATABASE_REPLICA_URL", "postgresql+asyncpg://user@replica/spimex_db")
+    mocker.patch.object(trading, "DB_REPLICA_GRACE_PERIOD", 60)
+    replica = mocker.patch.object(trading, "ReadSessionLocal")
+    clock = mocker.patch("api_service.local_cache.time.monotonic", return_value=100.0)
+    cache = TwoTierCache(LocalCache(), AsyncMock())
+
+    # Процесс ещё не видел загрузок: читаем реплику
+    assert trading.fill_sessionmaker(cache) is replica
+
+    # Реплика может отставать от только что загруженных торгов
+    await cache.set_version("v2")
+    clock.return_value = 130.0
+    assert trading.fill_sessionmaker(cache) is trading.AsyncSessionLocal
+
+    clock.return_value = 161.0
+    assert trading.fill_sessionmaker(cache) is replica
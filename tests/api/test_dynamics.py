@@ -1,14 +1,17 @@
 from datetime import date
+import base64
 import pytest
 import json
-from api_service.models import ParsedData
+from api_service.models import TradingResult
+from api_service.routers.trading import encode_cursor, pack_page
+from api_service.schemas import ParsedDataSchema
 
 
 @pytest.mark.asyncio
-async def test_get_dynamics_no_filters(client, mock_db_session):
+async def test_get_dynamics_no_filters(client, mock_db_session, as_row):
     """Без фильтров — возвращаем все данные за период"""
     fake_data = [
-        ParsedData(
+        TradingResult(
             exchange_product_id="EP1",
             exchange_product_name="Fuel",
             oil_id="OIL001",
@@ -20,7 +23,7 @@ async def test_get_dynamics_no_filters(client, mock_db_session):
             count=1,
             date=date(2023, 10, 5),
         ),
-        ParsedData(
+        TradingResult(
             exchange_product_id="EP2",
             exchange_product_name="Diesel",
             oil_id="OIL002",
@@ -36,7 +39,7 @@ async def test_get_dynamics_no_filters(client, mock_db_session):
 
     # Мокируем результат БД
     mock_result = mock_db_session.execute.return_value
-    mock_result.all.return_value = [(item,) for item in fake_data]
+    mock_result.all.return_value = [as_row(item) for item in fake_data]
 
     response = client.get("/trading/dynamics")
 
@@ -47,10 +50,10 @@ async def test_get_dynamics_no_filters(client, mock_db_session):
 
 
 @pytest.mark.asyncio
-async def test_get_dynamics_with_filters(client, mock_db_session):
+async def test_get_dynamics_with_filters(client, mock_db_session, as_row):
     """С фильтрами — только подходящие записи"""
     fake_data = [
-        ParsedData(
+        TradingResult(
             oil_id="OIL001",
             delivery_type_id="DT1",
             delivery_basis_id="DB1",
@@ -59,7 +62,7 @@ async def test_get_dynamics_with_filters(client, mock_db_session):
         )
     ]
     mock_result = mock_db_session.execute.return_value
-    mock_result.all.return_value = [(item,) for item in fake_data]
+    mock_result.all.return_value = [as_row(item) for item in fake_data]
 
     response = client.get(
         "/trading/dynamics",
@@ -99,7 +102,7 @@ async def test_get_dynamics_cached(client, mock_redis, mock_db_session):
             "updated_on": "2023-10-05"
         }
     ]
-    mock_redis.get.return_value = json.dumps(cached_data)
+    mock_redis.get.return_value = pack_page(None, json.dumps(cached_data).encode())
 
     response = client.get("/trading/dynamics", params={"oil_id": "OIL001"})
 
@@ -107,4 +110,93 @@ async def test_get_dynamics_cached(client, mock_redis, mock_db_session):
     assert response.json() == cached_data
 
     # БД не должна вызываться
-    assert mock_db_session.execute.called is False
\ No newline at end of file
+    assert mock_db_session.execute.called is False
+
+
+@pytest.mark.asyncio
+async def test_get_dynamics_keyset_pagination(client, mock_db_session, mock_redis, as_row):
+    """Отдаём limit строк и курсор по (date, id) последней из них"""
+    fake_data = [TradingResult(id=i, oil_id="OIL001", date=date(2023, 10, i)) for i in range(1, 4)]
+    mock_result = mock_db_session.execute.return_value
+    mock_result.all.return_value = [as_row(item) for item in fake_data]
+
+    cursor = encode_cursor(date(2023, 9, 30), 7)
+    response = client.get("/trading/dynamics", params={"limit": 2, "cursor": cursor})
+
+    assert response.status_code == 200
+    assert [row["date"] for row in response.json()] == ["2023-10-01", "2023-10-02"]
+    assert response.headers["X-Next-Cursor"] == encode_cursor(date(2023, 10, 2), 2)
+
+    query = mock_db_session.execute.call_args[0][0]
+    compiled = query.compile()
+    assert "(parsed_data_view.date, parsed_data_view.id) > (" in str(compiled)
+    assert "ORDER BY parsed_data_view.date, parsed_data_view.id" in str(compiled)
+    # Запрашиваем на одну строку больше, чтобы узнать о следующей странице
+    assert query._limit == 3
+    assert list(compiled.params.values()) == [date(2023, 9, 30), 7, 3]
+
+
+@pytest.mark.asyncio
+async def test_get_dynamics_last_page_has_no_cursor(client, mock_db_session, as_row):
+    mock_result = mock_db_session.execute.return_value
+    mock_result.all.return_value = [as_row(TradingResult(id=1, date=date(2023, 10, 1)))]
+
+    response = client.get("/trading/dynamics", params={"limit": 2})
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_get_dynamics_fields_projection(client, mock_db_session, as_row):
+    """fields= выбирает в SQL и отдаёт в ответе только запрошенные колонки"""
+    item = TradingResult(id=1, oil_id="OIL001", volume=1000, date=date(2023, 10, 1))
+    mock_result = mock_db_session.execute.return_value
+    mock_result.all.return_value = [as_row(item, ("oil_id", "volume"))]
+
+    response = client.get("/trading/dynamics", params=[("fields", "volume"), ("fields", "oil_id")])
+
+    assert response.status_code == 200
+    assert response.json() == [{"oil_id": "OIL001", "volume": 1000}]
+
+    selected = [column.name for column in mock_db_session.execute.call_args[0][0].selected_columns]
+    assert selected == ["date", "id", "oil_id", "volume"]
+
+
+def test_dynamics_projection_keeps_results_contract(client):
+    """Необязательные поля только у строки /dynamics, схема /results по-прежнему с required"""
+    schemas = client.get("/openapi.json").json()["components"]["schemas"]
+
+    assert schemas["ParsedDataSchema"]["required"] == list(ParsedDataSchema.model_fields)
+    assert "required" not in schemas["DynamicsRowSchema"]
+
+
+@pytest.mark.asyncio
+async def test_get_dynamics_rejects_bad_cursor_and_limit(client):
+    assert client.get("/trading/dynamics", params={"cursor": "not-a-cursor"}).status_code == 400
+    bad = base64.urlsafe_b64encode(b'{"date": 1}').decode()
+    assert client.get("/trading/dynamics", params={"cursor": bad}).status_code == 400
+    assert client.get("/trading/dynamics", params={"limit": 0}).status_code == 422
+    assert client.get("/trading/dynamics", params={"fields": "id"}).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_dynamics_cache_stores_and_returns_raw_bytes(client, mock_redis, mock_db_session, as_row):
+    """В кэш кладутся готовые байты ответа и курсор, при попадании они отдаются как есть"""
+    fake_data = [TradingResult(id=i, oil_id="OIL001", date=date(2023, 10, i)) for i in (1, 2)]
+    mock_db_session.execute.return_value.all.return_value = [as_row(item, ("oil_id",)) for item in fake_data]
+
+    response = client.get("/trading/dynamics", params={"limit": 1, "fields": "oil_id"})
+
+    cached = mock_redis.setex.call_args[0][2]
+    assert isinstance(cached, bytes)
+    assert cached == pack_page(response.headers["X-Next-Cursor"], response.content)
+
+    mock_redis.get.return_value = cached
+    mock_db_session.execute.reset_mock()
+    hit = client.get("/trading/dynamics", params={"limit": 1, "fields": "oil_id"})
+
+    assert hit.content == response.content == b'[{"oil_id":"OIL001"}]'
+    assert hit.headers["X-Next-Cursor"] == response.headers["X-Next-Cursor"]
+    assert hit.headers["content-type"] == "application/json"
+    mock_db_session.execute.assert_not_called()
@@ -0,0 +1,66 @@
+from datetime import date
+import gzip
+import json
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_streams_batches(client, mocker, mock_stream_session):
+    session = mock_stream_session([
+        [("OIL001", 100, date(2023, 10, 5))],
+        [("OIL002", 200, date(2023, 10, 6))],
+    ])
+
+    response = client.get("/trading/export", params=[("fields", "oil_id"), ("fields", "volume"),
+                                                     ("fields", "date"), ("oil_id", "OIL001")])
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"oil_id": "OIL001", "volume": 100, "date": "2023-10-05"},
+        {"oil_id": "OIL002", "volume": 200, "date": "2023-10-06"},
+    ]
+
+    # Серверный курсор с чтением пачками
+    query = session.stream.call_args[0][0]
+    assert query.get_execution_options()["yield_per"] > 0
+    compiled = str(query.compile())
+    assert "parsed_data_view.oil_id = " in compiled
+    assert "ORDER BY parsed_data_view.date, parsed_data_view.id" in compiled
+
+
+@pytest.mark.asyncio
+async def test_export_csv_gzip(client, mocker, mock_stream_session):
+    mock_stream_session([[("OIL001", None)], [("OIL,2", 5)]])
+
+    response = client.get("/trading/export", params=[("format", "csv"), ("gzip", "true"),
+                                                     ("fields", "volume"), ("fields", "oil_id")])
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    # TestClient сам распаковывает ответ с Content-Encoding: gzip
+    assert response.text.splitlines() == ["oil_id,volume", "OIL001,", '"OIL,2",5']
+
+
+@pytest.mark.asyncio
+async def test_export_empty_csv_has_header(client, mocker, mock_stream_session):
+    mock_stream_session([])
+
+    response = client.get("/trading/export", params={"format": "csv", "fields": "date"})
+
+    assert response.text.splitlines() == ["date"]
+
+
+@pytest.mark.asyncio
+async def test_gzip_stream_is_single_member():
+    from api_service.export import encode_rows, gzip_stream
+
+    async def batches():
+        yield [(1,)]
+        yield [(2,)]
+
+    chunks = [chunk async for chunk in gzip_stream(encode_rows("csv", ["count"], batches()))]
+
+    assert len(chunks) == 3
+    assert gzip.decompress(b"".join(chunks)).decode().splitlines() == ["count", "1", "2"]
@@ -0,0 +1,87 @@
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from api_service.invalidation import CacheInvalidator, listen_dsn
+from api_service.local_cache import LocalCache, TwoTierCache
+from api_service.routers import trading
+from shared.events import ingest_payload, parse_ingest_payload
+
+
+def make_cache():
+    redis = AsyncMock()
+    redis.get.return_value = None
+    redis.available = True
+    return TwoTierCache(LocalCache(), redis)
+
+
+def test_ingest_payload_roundtrip():
+    payload = ingest_payload([date(2024, 1, 10), datetime(2024, 1, 9)], version="v2")
+    assert parse_ingest_payload(payload) == ("v2", "2024-01-09", "2024-01-10")
+    assert listen_dsn("postgresql+asyncpg://user:pw@db/spimex") == "postgresql://user:pw@db/spimex"
+
+
+@pytest.mark.asyncio
+async def test_new_version_hides_old_keys():
+    cache = make_cache()
+    await cache.setex("results:", 60, b"old")
+
+    await cache.set_version("v2")
+
+    cache.redis.set.assert_awaited_once_with("cache:version", "v2")
+    assert await cache.get("results:") is None
+    cache.redis.get.assert_awaited_with("v2:results:")
+
+
+@pytest.mark.asyncio
+async def test_notifications_are_coalesced_and_warmed_once():
+    cache = make_cache()
+    cache.redis.set.return_value = True
+    warm = AsyncMock(return_value=3)
+    invalidator = CacheInvalidator(cache, warm, delay=0.01)
+
+    # Несколько загрузок подряд: кэш переключается на последнюю версию один раз
+    invalidator.on_notify(None, 1, "ingest_completed", ingest_payload([date(2024, 1, 9)], version="v1"))
+    invalidator.on_notify(None, 1, "ingest_completed", ingest_payload([date(2024, 1, 10)], version="v2"))
+    await invalidator.apply_task
+
+    assert cache.version == "v2"
+    warm.assert_awaited_once_with(cache)
+    cache.redis.set.assert_any_await("cache:warm:v2", b"1", nx=True, ex=60)
+
+
+@pytest.mark.asyncio
+async def test_only_lock_holder_warms():
+    cache = make_cache()
+    cache.redis.set.return_value = None
+    warm = AsyncMock()
+    invalidator = CacheInvalidator(cache, warm, delay=0)
+
+    invalidator.on_notify(None, 1, "ingest_completed", ingest_payload([], version="v3"))
+    await invalidator.apply_task
+
+    assert cache.version == "v3"
+    warm.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_warm_cache_refreshes_default_and_popular_queries(mocker, mock_db_session):
+    session_cm = MagicMock()
+    session_cm.__aenter__ = AsyncMock(return_value=mock_db_session)
+    session_cm.__aexit__ = AsyncMock(return_value=False)
+    mocker.patch("api_service.routers.trading.AsyncSessionLocal", return_value=session_cm)
+    mocker.patch.object(trading, "popular_queries", trading.Counter())
+    mock_db_session.execute.return_value.all.return_value = []
+    cache = AsyncMock()
+
+    trading.track_query("results", oil_id="A001", delivery_type_id=None, delivery_basis_id=None)
+    trading.track_query("last_dates", n=5)
+
+    assert await trading.warm_cache(cache) == 4
+
+    keys = [call.args[0] for call in cache.setex.await_args_list]
+    assert keys == [
+        trading.generate_cache_key("last_dates", n=5),
+        trading.generate_cache_key("results"),
+        trading.generate_cache_key("dynamics", limit=1000, fields=trading.RESPONSE_FIELDS),
+        trading.generate_cache_key("results", oil_id="A001"),
+    ]
@@ -15,6 +15,11 @@ async def test_get_last_trading_dates(client, mock_db_session):
     assert response.status_code == 200
     assert response.json() == {"dates": ["2023-12-05", "2023-12-04"]}
 
+    # Даты берутся из справочника, а не из parsed_data
+    query = str(mock_db_session.execute.call_args[0][0])
+    assert "trading_dates" in query
+    assert "parsed_data" not in query
+
 
 @pytest.mark.asyncio
 async def test_get_last_trading_dates_cached(client, mock_redis, mock_db_session):
@@ -0,0 +1,76 @@
+from unittest.mock import AsyncMock
+import pytest
+from api_service.local_cache import LocalCache, TwoTierCache
+from api_service.main import app
+
+
+def test_local_cache_evicts_least_recently_used_by_bytes():
+    cache = LocalCache(max_items=10, max_bytes=10, ttl=60)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    assert cache.get("a") == b"1234"
+
+    # Не влезает по объёму: вытесняется давно не запрошенный ключ b
+    cache.set("c", b"1234")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+    # Значение больше всего кэша не кладётся
+    cache.set("big", b"x" * 11)
+    assert cache.get("big") is None
+
+
+def test_local_cache_ttl(mocker):
+    clock = mocker.patch("api_service.local_cache.time.monotonic", return_value=100.0)
+    cache = LocalCache(ttl=60)
+    cache.set("short", b"1", ttl=5)
+    cache.set("long", b"2", ttl=3600)
+
+    clock.return_value = 106.0
+    assert cache.get("short") is None
+    assert cache.get("long") == b"2"
+
+    # TTL в памяти ограничен LOCAL_CACHE_TTL
+    clock.return_value = 161.0
+    assert cache.get("long") is None
+    assert cache.stats()["items"] == 0
+
+
+@pytest.mark.asyncio
+async def test_two_tier_cache_serves_hot_key_from_memory():
+    redis = AsyncMock()
+    redis.get.return_value = b"\x00cached"
+    cache = TwoTierCache(LocalCache(), redis)
+
+    assert await cache.get("key") == b"cached"
+    assert await cache.get("key") == b"cached"
+
+    # Второй запрос не дошёл до Redis
+    assert redis.get.call_count == 1
+    stats = cache.stats()
+    assert stats["redis"] == {"hits": 1, "misses": 0}
+    assert stats["local"]["hits"] == 1
+    assert stats["local"]["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_two_tier_cache_setex_writes_both_tiers():
+    redis = AsyncMock()
+    cache = TwoTierCache(LocalCache(), redis)
+
+    await cache.setex("key", 30, b"body")
+
+    redis.setex.assert_awaited_once_with("0:key", 30, b"\x00body")
+    assert await cache.get("key") == b"body"
+    redis.get.assert_not_called()
+
+
+def test_cache_stats_endpoint(client):
+    response = client.get("/cache/stats")
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"version", "local", "redis"}
+    assert isinstance(app.state.cache, TwoTierCache)
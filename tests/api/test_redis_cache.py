@@ -0,0 +1,86 @@
+from unittest.mock import AsyncMock
+import pytest
+from redis.exceptions import ConnectionError, TimeoutError
+from api_service.local_cache import LocalCache, TwoTierCache
+from api_service.main import app
+from api_service.redis_cache import DELETE_IF_EQUAL_SCRIPT, SafeRedis, create_redis
+from api_service.routers.trading import get_redis_client
+
+
+@pytest.mark.asyncio
+async def test_safe_redis_degrades_and_retries_later(mocker):
+    client = AsyncMock()
+    client.get.side_effect = ConnectionError("refused")
+    redis = SafeRedis(client, retry_interval=5)
+    clock = mocker.patch("api_service.redis_cache.time.monotonic", return_value=100.0)
+
+    assert await redis.get("key") is None
+    assert not redis.available
+
+    # Пока Redis отключён, к нему не обращаемся
+    await redis.get("key")
+    await redis.setex("key", 10, b"value")
+    assert client.get.call_count == 1
+    client.setex.assert_not_called()
+
+    # После паузы пробуем снова
+    clock.return_value = 106.0
+    client.get.side_effect = None
+    client.get.return_value = b"cached"
+    assert await redis.get("key") == b"cached"
+    assert redis.available
+
+
+@pytest.mark.asyncio
+async def test_safe_redis_swallows_setex_timeout():
+    client = AsyncMock()
+    client.setex.side_effect = TimeoutError()
+    redis = SafeRedis(client)
+
+    await redis.setex("key", 10, b"value")
+
+    assert not redis.available
+
+
+@pytest.mark.asyncio
+async def test_safe_redis_delete_if_equal_runs_one_script():
+    client = AsyncMock()
+    client.eval.return_value = 1
+    redis = SafeRedis(client)
+
+    assert await redis.delete_if_equal("lock:key", b"token") == 1
+    client.eval.assert_awaited_once_with(DELETE_IF_EQUAL_SCRIPT, 1, "lock:key", b"token")
+
+    client.eval.side_effect = ConnectionError("refused")
+    assert await redis.delete_if_equal("lock:key", b"token") == 0
+    assert not redis.available
+
+
+@pytest.mark.asyncio
+async def test_create_redis_unreachable_server_is_cache_miss():
+    redis = create_redis("redis://127.0.0.1:1/0")
+    try:
+        assert await redis.get("key") is None
+        assert not redis.available
+    finally:
+        await redis.close()
+
+
+def test_lifespan_creates_one_client_per_app(client):
+    # Фикстура client запускает приложение: клиент создан в lifespan и лежит в app.state
+    assert isinstance(app.state.redis, SafeRedis)
+    assert app.state.redis.client.connection_pool.max_connections > 1
+
+
+@pytest.mark.asyncio
+async def test_endpoint_works_with_redis_down(client, mock_db_session):
+    failing = AsyncMock()
+    failing.get.side_effect = ConnectionError("refused")
+    failing.setex.side_effect = ConnectionError("refused")
+    app.dependency_overrides[get_redis_client] = lambda: TwoTierCache(LocalCache(), SafeRedis(failing))
+    mock_db_session.execute.return_value.all.return_value = []
+
+    response = client.get("/trading/last_dates")
+
+    assert response.status_code == 200
+    assert response.json() == {"dates": []}
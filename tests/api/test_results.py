@@ -1,11 +1,12 @@
 from datetime import date
 import pytest
 import json
-from api_service.models import ParsedData
+from api_service.models import TradingResult
+from api_service.schemas import ParsedDataSchema
 
 
 @pytest.mark.asyncio
-async def test_get_trading_results_last_date(client, mock_db_session):
+async def test_get_trading_results_last_date(client, mock_db_session, as_row):
     """Возвращаем последние торги за последнюю дату"""
     # Мок: последняя дата
     last_date_result = mock_db_session.execute.return_value
@@ -13,7 +14,7 @@ async def test_get_trading_results_last_date(client, mock_db_session):
 
     # Мок: данные за эту дату
     fake_data = [
-        ParsedData(
+        TradingResult(
             oil_id="OIL001",
             delivery_type_id="DT1",
             delivery_basis_id="DB1",
@@ -22,7 +23,7 @@ async def test_get_trading_results_last_date(client, mock_db_session):
         )
     ]
     data_result = mock_db_session.execute.return_value
-    data_result.all.return_value = [(item,) for item in fake_data]
+    data_result.all.return_value = [as_row(item, key=()) for item in fake_data]
 
     # Два вызова execute(): сначала last_date, потом данные
     mock_db_session.execute.side_effect = [last_date_result, data_result]
@@ -36,14 +37,14 @@ async def test_get_trading_results_last_date(client, mock_db_session):
 
 
 @pytest.mark.asyncio
-async def test_get_trading_results_with_filters(client, mock_db_session):
+async def test_get_trading_results_with_filters(client, mock_db_session, as_row):
     """С фильтрами — только подходящие записи"""
     last_date_result = mock_db_session.execute.return_value
     last_date_result.scalar_one_or_none.return_value = date(2023, 10, 5)
 
-    fake_data = [ParsedData(oil_id="OIL001", delivery_type_id="DT1", date=date(2023, 10, 5))]
+    fake_data = [TradingResult(oil_id="OIL001", delivery_type_id="DT1", date=date(2023, 10, 5))]
     data_result = mock_db_session.execute.return_value
-    data_result.all.return_value = [(item,) for item in fake_data]
+    data_result.all.return_value = [as_row(item, key=()) for item in fake_data]
 
     mock_db_session.execute.side_effect = [last_date_result, data_result]
 
@@ -59,6 +60,13 @@ async def test_get_trading_results_with_filters(client, mock_db_session):
     second_call_query = str(calls[1][0][0])
     assert "oil_id" in second_call_query
 
+    # Последняя дата берётся из справочника торговых дат
+    assert "max(trading_dates.date)" in str(calls[0][0][0])
+
+    # Выбираются только колонки ответа, без ORM-объектов
+    selected = [column.name for column in calls[1][0][0].selected_columns]
+    assert selected == list(ParsedDataSchema.model_fields)
+
 
 @pytest.mark.asyncio
 async def test_get_trading_results_no_data(client, mock_db_session):
@@ -0,0 +1,126 @@
+import asyncio
+from unittest.mock import AsyncMock
+import pytest
+from api_service.local_cache import LocalCache, TwoTierCache
+from api_service.single_flight import fill, load_once
+
+
+class DictRedis:
+    """Redis в памяти с SET NX для блокировок"""
+
+    available = True
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def set(self, key, value, nx=False, **kwargs):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete_if_equal(self, key, value):
+        if self.data.get(key) != value:
+            return 0
+        del self.data[key]
+        return 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_run_one_load():
+    cache = TwoTierCache(LocalCache(), DictRedis())
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b"body"
+
+    bodies = await asyncio.gather(*(load_once(cache, "results:", load) for _ in range(50)))
+
+    assert bodies == [b"body"] * 50
+    assert calls == 1
+    # Блокировка снята после загрузки
+    assert not any(key.startswith("lock:") for key in cache.redis.data)
+
+
+@pytest.mark.asyncio
+async def test_other_worker_serves_stale_while_lock_is_held():
+    redis = DictRedis()
+    cache = TwoTierCache(LocalCache(), redis)
+    await cache.setex("results:", 60, b"old")
+    await cache.set_version("v2")
+    # Ключ загружает другой процесс
+    await redis.set("lock:v2:results:", b"1", nx=True)
+    load = AsyncMock()
+
+    assert await load_once(cache, "results:", load) == b"old"
+    load.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_other_worker_waits_for_value_without_stale():
+    redis = DictRedis()
+    cache = TwoTierCache(LocalCache(), redis)
+    await redis.set("lock:0:results:", b"1", nx=True)
+    load = AsyncMock()
+
+    async def other_worker():
+        await asyncio.sleep(0.02)
+        await redis.setex("0:results:", 60, cache.codec.encode(b"fresh"))
+
+    body, _ = await asyncio.gather(fill(cache, "results:", load, lock_ttl=1, poll_interval=0.005), other_worker())
+
+    assert body == b"fresh"
+    load.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_lock_timeout_falls_back_to_own_load():
+    redis = DictRedis()
+    cache = TwoTierCache(LocalCache(), redis)
+    await redis.set("lock:0:results:", b"1", nx=True)
+    load = AsyncMock(return_value=b"body")
+
+    assert await fill(cache, "results:", load, lock_ttl=0.02, poll_interval=0.005) == b"body"
+    load.assert_awaited_once()
+    # Блокировку держит другой процесс: загрузившись сами, мы её не снимаем
+    assert redis.data["lock:0:results:"] == b"1"
+
+
+@pytest.mark.asyncio
+async def test_slow_load_keeps_successors_lock():
+    redis = DictRedis()
+    cache = TwoTierCache(LocalCache(), redis)
+
+    async def load():
+        # Загрузка не уложилась в TTL: блокировка истекла, и её взял другой процесс
+        redis.data["lock:0:results:"] = b"successor"
+        return b"body"
+
+    assert await fill(cache, "results:", load) == b"body"
+    assert redis.data["lock:0:results:"] == b"successor"
+
+
+@pytest.mark.asyncio
+async def test_load_started_before_version_switch_stays_in_old_version():
+    redis = DictRedis()
+    cache = TwoTierCache(LocalCache(), redis)
+
+    async def load():
+        # Пока идёт запрос к БД, приходит уведомление о загрузке новых данных
+        await cache.set_version("v2")
+        return b"old rows"
+
+    assert await load_once(cache, "results:", load) == b"old rows"
+
+    assert await cache.get("results:") is None
+    assert cache.codec.decode(redis.data["0:results:"]) == b"old rows"
+    assert not any(key.startswith("lock:") for key in redis.data)
@@ -3,18 +3,26 @@ from unittest.mock import AsyncMock, MagicMock
 from fastapi.testclient import TestClient
 import pytest_asyncio
 from datetime import date
+from types import SimpleNamespace
 
 from api_service.main import app
-from api_service.database import get_db
-from api_service.models import ParsedData
+from api_service.database import get_db, get_read_db
+from api_service.models import TradingResult
+from api_service.schemas import ParsedDataSchema
 from api_service.routers.trading import get_redis_client  # ← импортируем зависимость
+from parser_service.parser import ROW_FIELDS
 
 
 @pytest_asyncio.fixture
-async def client(mock_db_session, mock_redis):
+async def client(mock_db_session, mock_redis, mocker):
     # Заменяем зависимости
     app.dependency_overrides[get_db] = lambda: mock_db_session
+    app.dependency_overrides[get_read_db] = lambda: mock_db_session
     app.dependency_overrides[get_redis_client] = lambda: mock_redis
+    # Загрузки кэша открывают собственную сессию
+    session_cm = AsyncMock()
+    session_cm.__aenter__.return_value = mock_db_session
+    mocker.patch("api_service.routers.trading.ReadSessionLocal", return_value=session_cm)
 
     with TestClient(app) as c:
         yield c
@@ -40,14 +48,14 @@ def mock_db_session():
 
     # 1. Для .all() → возвращаем список (НЕ корутину!)
     mock_result.all.return_value = [
-        (ParsedData(oil_id="OIL001", delivery_type_id="DT1", date=date(2023, 10, 5)),),
-        (ParsedData(oil_id="OIL002", delivery_type_id="DT2", date=date(2023, 10, 4)),),
+        (TradingResult(oil_id="OIL001", delivery_type_id="DT1", date=date(2023, 10, 5)),),
+        (TradingResult(oil_id="OIL002", delivery_type_id="DT2", date=date(2023, 10, 4)),),
     ]
 
     # 2. Если используется .scalars().all() → тоже настраиваем
     mock_result.scalars.return_value.all.return_value = [
-        ParsedData(oil_id="OIL001", delivery_type_id="DT1", date=date(2023, 10, 5)),
-        ParsedData(oil_id="OIL002", delivery_type_id="DT2", date=date(2023, 10, 4)),
+        TradingResult(oil_id="OIL001", delivery_type_id="DT1", date=date(2023, 10, 5)),
+        TradingResult(oil_id="OIL002", delivery_type_id="DT2", date=date(2023, 10, 4)),
     ]
 
     # 3. Для .scalar_one_or_none() — возвращаем один объект или None
@@ -56,4 +64,38 @@ def mock_db_session():
     # Привязываем результат к execute
     mock.execute.return_value = mock_result
 
-    return mock
\ No newline at end of file
+    return mock
+
+
+@pytest.fixture
+def make_row():
+    """Строка разбора в порядке ROW_FIELDS из именованных полей, остальные поля - None"""
+    return lambda **fields: tuple(fields.get(name) for name in ROW_FIELDS)
+
+
+@pytest.fixture
+def as_row():
+    """Строка результата Core-запроса: колонки ключа курсора и выбранные колонки"""
+    def make(item, fields=tuple(ParsedDataSchema.model_fields), key=("date", "id")):
+        values = {name: getattr(item, name) for name in (*key, *fields)}
+        return SimpleNamespace(**values, _mapping=values)
+    return make
+
+
+@pytest.fixture
+def mock_stream_session(mocker):
+    """Сессия загрузки, у которой stream() отдаёт строки заданными пачками"""
+    def make(batches):
+        async def partitions():
+            for batch in batches:
+                yield batch
+
+        stream_result = MagicMock()
+        stream_result.partitions = partitions
+        session = AsyncMock()
+        session.stream.return_value = stream_result
+        session_cm = AsyncMock()
+        session_cm.__aenter__.return_value = session
+        mocker.patch("api_service.routers.trading.ReadSessionLocal", return_value=session_cm)
+        return session
+    return make
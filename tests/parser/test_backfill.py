@@ -0,0 +1,120 @@
+import pytest
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+from parser_service.backfill import BackfillParserTrade, COLUMNS, STAGING_TABLE
+
+
+def make_rows(make_row, n, **fields):
+    return [
+        make_row(**{"exchange_product_id": f"A12345678{i:02d}", "exchange_product_name": "Бензин",
+                    "oil_id": "A123", "volume": i, "date": date(2023, 1, 1), **fields})
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_save_rows_buffers_until_flush_size(mocker, make_row):
+    parser = BackfillParserTrade(flush_size=5)
+    mock_flush = mocker.patch.object(parser, "flush", AsyncMock())
+
+    await parser.save_rows(make_rows(make_row, 3))
+    mock_flush.assert_not_called()
+    assert len(parser.buffer) == 3
+    assert len(parser.buffer[0]) == len(COLUMNS)
+
+    await parser.save_rows(make_rows(make_row, 3))
+    mock_flush.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_save_rows_keeps_name_from_latest_bulletin(mocker, make_row):
+    parser = BackfillParserTrade()
+    newer = make_rows(make_row, 1, exchange_product_name="Новое", date=date(2024, 3, 1))
+    older = make_rows(make_row, 1, exchange_product_name="Старое", date=date(2023, 3, 1))
+
+    await parser.save_rows(newer)
+    await parser.save_rows(older)
+
+    assert parser.names["exchange_product_id"] == {"A1234567800": ("Новое", date(2024, 3, 1))}
+
+
+@pytest.mark.asyncio
+async def test_flush_copies_records_into_staging(mocker, make_row):
+    pg = MagicMock()
+    pg.execute = AsyncMock()
+    pg.copy_records_to_table = AsyncMock()
+    pg.transaction.return_value.__aenter__ = AsyncMock()
+    pg.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+
+    conn = MagicMock()
+    conn.get_raw_connection = AsyncMock(return_value=MagicMock(driver_connection=pg))
+    conn_cm = MagicMock()
+    conn_cm.__aenter__ = AsyncMock(return_value=conn)
+    conn_cm.__aexit__ = AsyncMock(return_value=False)
+    mock_engine = mocker.patch("parser_service.backfill.engine")
+    mock_engine.connect.return_value = conn_cm
+
+    parser = BackfillParserTrade()
+    await parser.save_rows(make_rows(make_row, 2)[::-1])
+    await parser.flush()
+
+    records = pg.copy_records_to_table.call_args.kwargs["records"]
+    assert pg.copy_records_to_table.call_args.args == (STAGING_TABLE,)
+    assert len(records) == 2
+    assert parser.rows_loaded == 2
+    assert parser.buffer == []
+
+    merge_sql, dates_sql, delete_sql, aggregates_sql = (call.args[0] for call in pg.execute.call_args_list[-4:])
+    assert "ON CONFLICT (exchange_product_id, date) DO UPDATE" in merge_sql
+    assert "ORDER BY exchange_product_id, date, ctid DESC" in merge_sql
+    assert dates_sql.startswith("INSERT INTO trading_dates")
+    assert delete_sql.startswith("DELETE FROM daily_aggregates")
+    assert aggregates_sql.startswith("INSERT INTO daily_aggregates")
+    # Уведомление API отложено до конца запуска
+    assert parser.ingested_dates == {date(2023, 1, 1)}
+
+    # Названия продуктов обновляются в справочнике в порядке кодов, в COPY их нет
+    products_call = next(call for call in pg.execute.call_args_list if "INSERT INTO products" in call.args[0])
+    assert products_call.args[1:] == (
+        ["A1234567800", "A1234567801"], ["Бензин", "Бензин"], [date(2023, 1, 1), date(2023, 1, 1)],
+    )
+    assert "WHERE products.last_seen_date < EXCLUDED.last_seen_date" in products_call.args[0]
+    assert "exchange_product_name" not in COLUMNS
+    assert parser.names == {"exchange_product_id": {}, "delivery_basis_id": {}}
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows_in_buffer(mocker, make_row):
+    mock_engine = mocker.patch("parser_service.backfill.engine")
+    mock_engine.connect.side_effect = ConnectionError("refused")
+
+    parser = BackfillParserTrade()
+    await parser.save_rows(make_rows(make_row, 2))
+    with pytest.raises(ConnectionError):
+        await parser.flush()
+
+    # Строки и названия не потеряны: их загрузит следующий flush
+    assert len(parser.buffer) == 2
+    assert set(parser.names["exchange_product_id"]) == {"A1234567800", "A1234567801"}
+    assert parser.rows_loaded == 0
+
+
+@pytest.mark.asyncio
+async def test_notify_ingest_flushes_buffer_first(mocker, make_row):
+    parser = BackfillParserTrade()
+    order = []
+
+    async def copy(records, names):
+        order.append("copy")
+        parser.ingested_dates.add(date(2023, 1, 1))
+
+    async def notify():
+        order.append(("notify", set(parser.ingested_dates)))
+
+    mocker.patch.object(parser, "_copy", side_effect=copy)
+    mocker.patch("parser_service.parser.ParserTrade.notify_ingest", side_effect=notify)
+
+    await parser.save_rows(make_rows(make_row, 2))
+    await parser.notify_ingest()
+
+    assert order == ["copy", ("notify", {date(2023, 1, 1)})]
@@ -20,13 +20,11 @@ async def test_download_xls_success(mocker):
     mock_session = MagicMock()  # Не AsyncMock! Чтобы можно было контролировать get
     mock_session.get.return_value = mock_cm
 
-    # 4. Мокаем ClientSession() → возвращаем mock_session при создании
-    mock_client_session = mocker.patch("aiohttp.ClientSession", autospec=True)
-    mock_client_session.return_value.__aenter__.return_value = mock_session
-    mock_client_session.return_value.__aexit__ = AsyncMock()
+    # 4. Парсер использует общую сессию, открытую на всё время работы
+    parser = ParserTrade()
+    parser.session = mock_session
 
     # 5. Запускаем тестируемый метод
-    parser = ParserTrade()
     result = await parser.download_xls("https://spimex.com/file.xls")
 
     # 6. Проверяем результат
@@ -35,6 +33,22 @@ async def test_download_xls_success(mocker):
     assert result.getvalue() == b"fake excel content"
 
     # 7. Проверяем, что всё было вызвано
-    mock_client_session.assert_called_once()
-    mock_session.get.assert_called_once_with("https://spimex.com/file.xls", timeout=10)
-    mock_cm.__aenter__.assert_called_once()
\ No newline at end of file
+    mock_session.get.assert_called_once()
+    assert mock_session.get.call_args[0] == ("https://spimex.com/file.xls",)
+    mock_cm.__aenter__.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_session_counts_opened_and_reused_connections():
+    async with ParserTrade(limit_per_host=2) as parser:
+        session = parser.session
+        assert session.connector.limit_per_host == 2
+
+        trace_config = session.trace_configs[0]
+        await trace_config.on_connection_create_end.send(session, None, None)
+        await trace_config.on_connection_reuseconn.send(session, None, None)
+        await trace_config.on_connection_reuseconn.send(session, None, None)
+
+    assert parser.session is None
+    assert session.closed
+    assert parser.connection_stats == {"opened": 1, "reused": 2}
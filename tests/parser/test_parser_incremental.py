@@ -0,0 +1,48 @@
+import pytest
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock
+from parser_service.parser import ParserTrade
+
+HTML_SAMPLE = """
+<div class="accordeon-inner__item">
+    <a href="/upload/oil_xls/file3.xls" class="accordeon-inner__item-title link xls">Скачать</a>
+    <span>03.01.2023</span>
+</div>
+<div class="accordeon-inner__item">
+    <a href="/upload/oil_xls/file2.xls" class="accordeon-inner__item-title link xls">Скачать</a>
+    <span>02.01.2023</span>
+</div>
+<div class="accordeon-inner__item">
+    <a href="/upload/oil_xls/file1.xls" class="accordeon-inner__item-title link xls">Скачать</a>
+    <span>01.01.2023</span>
+</div>
+"""
+
+
+@pytest.mark.asyncio
+async def test_process_links_stops_on_known_date(mocker):
+    parser = ParserTrade(min_date=datetime(2023, 1, 1), incremental=True)
+    parser.known_dates = {date(2023, 1, 2)}
+
+    mock_download = AsyncMock(return_value=b"fake_xls")
+    mock_process_xls = AsyncMock()
+    mocker.patch.object(parser, "download_xls", mock_download)
+    mocker.patch.object(parser, "process_xls_and_save", mock_process_xls)
+
+    await parser._process_links(HTML_SAMPLE.encode("utf-8"))
+
+    # Скачан только бюллетень за 03.01, дальше пошли известные даты
+    mock_download.assert_called_once()
+    assert mock_download.call_args[0] == ("https://spimex.com/upload/oil_xls/file3.xls",)
+    assert parser.stop_event.is_set()
+
+
+@pytest.mark.asyncio
+async def test_fetch_page_skipped_after_stop():
+    parser = ParserTrade(incremental=True)
+    parser.stop_event.set()
+
+    session = MagicMock()
+    await parser._fetch_page(session, "https://spimex.com/page")
+
+    session.get.assert_not_called()
@@ -1,45 +1,73 @@
 import pytest
 import io
-from datetime import datetime
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 from unittest.mock import AsyncMock, MagicMock
 from xlrd import Book
 from xlrd.sheet import Sheet
-from parser_service.parser import ParserTrade
+from parser_service.parser import ParserTrade, parse_xls
 from parser_service.models import ParsedData
 
+# Фрагмент бюллетеня: шапка, строки с данными, строки, которые нужно пропустить, итог
+GOLDEN_ROWS = [
+    ["", "Форма СЭТ-БТ", "", "", "", "", ""],
+    ["", "Код Инструмента", "Наименование Инструмента", "Базис поставки",
+     "Объем Договоров в единицах измерения", "Обьем Договоров, руб.", "Количество Договоров, шт."],
+    ["", "A1234567890", "Бензин", "Санкт-Петербург", "100", "50000", "5"],
+    ["", "B2345678901", "ДТ", "Москва", "200", "100000.75", "10"],
+    ["", "C345678901", "Короткий код", "Москва", "1", "1", "1"],
+    ["", "D4567890123", "Без сделок", "Казань", "-", "-", "-"],
+    ["", "Итого:", "", "", "300", "150000", "15"],
+    ["", "", "", "", "", "", ""],
+]
 
-def create_fake_book():
+# Результат построчного разбора на GOLDEN_ROWS до перехода на разбор по колонкам
+GOLDEN_OUTPUT = [
+    ("A1234567890", "Бензин", "A123", "456", "Санкт-Петербург", "0", 100, 50000, 5, datetime(2023, 1, 1).date()),
+    ("B2345678901", "ДТ", "B234", "567", "Москва", "1", 200, 100000, 10, datetime(2023, 1, 1).date()),
+]
+
+
+def create_fake_book(rows):
     book = MagicMock(spec=Book)
     sheet = MagicMock(spec=Sheet)
-    sheet.nrows = 2
-    sheet.row_values.side_effect = [
-        ["", "A1234567890", "Бензин", "Санкт-Петербург", "100", "50000", "5"],
-        ["", "B2345678901", "ДТ", "Москва", "200", "100000", "10"]
-    ]
+    sheet.nrows = len(rows)
+    sheet.ncols = max((len(row) for row in rows), default=0)
+    sheet.row_values.side_effect = lambda rowx: rows[rowx]
+    sheet.col_values.side_effect = lambda colx: [row[colx] for row in rows]
     book.sheet_by_index.return_value = sheet
     return book
 
+
+def test_parse_xls_matches_golden_output(mocker):
+    mocker.patch("xlrd.open_workbook", return_value=create_fake_book(GOLDEN_ROWS))
+
+    assert parse_xls(b"fake content", datetime(2023, 1, 1)) == GOLDEN_OUTPUT
+
+
+def test_parse_xls_skips_narrow_sheet(mocker):
+    mocker.patch("xlrd.open_workbook", return_value=create_fake_book([["", "A1234567890", "Бензин"]]))
+
+    assert parse_xls(b"fake content", datetime(2023, 1, 1)) == []
+
+
 @pytest.mark.asyncio
 async def test_process_xls_and_save(mocker):
-    # 1. Мокаем лист Excel
-    mock_sheet = MagicMock()
-    mock_sheet.nrows = 2
-    mock_sheet.row_values.side_effect = [
+    # 1. Мокаем лист Excel и xlrd.open_workbook
+    mock_book = create_fake_book([
         ["", "A1234567890", "Бензин", "СПб", "100", "50000", "5"],
         ["", "B2345678901", "ДТ", "Москва", "200", "100000", "10"]
-    ]
-
-    # 2. Мокаем xlrd.open_workbook
-    mock_book = MagicMock()
-    mock_book.sheet_by_index.return_value = mock_sheet
+    ])
     mocker.patch("xlrd.open_workbook", return_value=mock_book)
 
-    # 3. Мокаем сессию
+    # 2. Мокаем сессию
     mock_session = AsyncMock()
     mock_session.execute = AsyncMock()
     mock_session.commit = AsyncMock()
 
-    # 4. Мокаем AsyncSessionLocal как асинхронный контекстный менеджер
+    # 3. Мокаем AsyncSessionLocal как асинхронный контекстный менеджер
     mock_session_cm = AsyncMock()
     mock_session_cm.__aenter__.return_value = mock_session
     mock_session_cm.__aexit__ = AsyncMock()
@@ -47,31 +75,57 @@ async def test_process_xls_and_save(mocker):
     # Самое важное: мокаем фабрику сессий
     mocker.patch("parser_service.parser.AsyncSessionLocal", return_value=mock_session_cm)
 
-    # 5. Запускаем тестируемую функцию
+    # 4. Запускаем тестируемую функцию
     parser = ParserTrade()
     fake_xls = io.BytesIO(b"fake content")
     test_date = datetime(2023, 1, 1)
 
     await parser.process_xls_and_save(fake_xls, test_date)
 
-    assert mock_session.execute.call_count == 1
-    call_args = mock_session.execute.call_args
+    # Справочники названий, вставка строк, пересчёт trading_dates и дневных агрегатов
+    # в одной транзакции; уведомление API отложено до конца запуска
+    assert mock_session.execute.call_count == 6
+    mock_session.commit.assert_called_once()
+    products_stmt, bases_stmt = (call[0][0] for call in mock_session.execute.call_args_list[:2])
+    call_args = mock_session.execute.call_args_list[2]
     stmt = call_args[0][0]  # объект Insert
 
+    # Названия уходят в справочники, а не в parsed_data
+    assert "INSERT INTO products" in str(products_stmt.compile())
+    assert list(products_stmt.compile().params.values()) == [
+        "A1234567890", "Бензин", test_date.date(), "B2345678901", "ДТ", test_date.date(),
+    ]
+    assert "INSERT INTO delivery_bases" in str(bases_stmt.compile())
+    # Название из более старого бюллетеня не заменяет текущее
+    assert "delivery_bases.last_seen_date < excluded.last_seen_date" in str(bases_stmt.compile())
+    assert "IS DISTINCT FROM" in str(bases_stmt.compile())
+
+    dates_stmt = str(mock_session.execute.call_args_list[3][0][0].compile())
+    assert "INSERT INTO trading_dates" in dates_stmt
+    assert "ON CONFLICT (date) DO UPDATE" in dates_stmt
+
+    delete_stmt, aggregates_stmt = (
+        str(call[0][0].compile()) for call in mock_session.execute.call_args_list[4:]
+    )
+    assert delete_stmt.startswith("DELETE FROM daily_aggregates")
+    assert "INSERT INTO daily_aggregates" in aggregates_stmt
+    assert "GROUP BY parsed_data.date" in aggregates_stmt
+    assert parser.ingested_dates == {test_date.date()}
+
     # === Достаём и разбираем данные ===
     params_values = list(stmt.compile().params.values())
 
     field_names = [
         "exchange_product_id",
-        "exchange_product_name",
         "oil_id",
         "delivery_basis_id",
-        "delivery_basis_name",
         "delivery_type_id",
         "volume",
         "total",
         "count",
-        "date"
+        "date",
+        "created_on",
+        "updated_on",
     ]
 
     chunk_size = len(field_names)
@@ -87,7 +141,136 @@ async def test_process_xls_and_save(mocker):
     assert inserted_data[0]["oil_id"] == "A123"
     assert inserted_data[0]["volume"] == 100
     assert inserted_data[0]["date"] == test_date.date()
+    assert inserted_data[0]["created_on"] == inserted_data[0]["updated_on"]
 
     assert inserted_data[1]["exchange_product_id"] == "B2345678901"
     assert inserted_data[1]["oil_id"] == "B234"
-    assert inserted_data[1]["volume"] == 200
\ No newline at end of file
+    assert inserted_data[1]["volume"] == 200
+
+    # Повторная загрузка не дублирует строки, а обновляет их по ключу
+    compiled = str(stmt.compile())
+    assert "ON CONFLICT (exchange_product_id, date) DO UPDATE" in compiled
+    assert "created_on = excluded.created_on" not in compiled
+
+
+@pytest.mark.asyncio
+async def test_save_rows_splits_into_batches(mocker, make_row):
+    mock_session = AsyncMock()
+    mock_session_cm = AsyncMock()
+    mock_session_cm.__aenter__.return_value = mock_session
+    mocker.patch("parser_service.parser.AsyncSessionLocal", return_value=mock_session_cm)
+
+    parser = ParserTrade(batch_size=2)
+    rows = [
+        make_row(exchange_product_id=f"A12345678{i:02d}", date=datetime(2023, 1, 1).date(), volume=i)
+        for i in range(5)
+    ]
+
+    await parser.save_rows(rows)
+
+    assert mock_session.execute.call_count == 6
+    mock_session.commit.assert_called_once()
+
+
+def test_lookup_stmts_keep_name_from_latest_bulletin(make_row):
+    rows = [
+        make_row(exchange_product_id="A1234567890", exchange_product_name="Новое", date=date(2024, 3, 1)),
+        make_row(exchange_product_id="A1234567890", exchange_product_name="Старое", date=date(2023, 3, 1)),
+    ]
+
+    (products_stmt,) = ParserTrade._lookup_stmts(rows)
+
+    assert list(products_stmt.compile().params.values()) == ["A1234567890", "Новое", date(2024, 3, 1)]
+
+
+def test_lookup_stmts_sorted_by_code(make_row):
+    rows = [
+        make_row(exchange_product_id=code, exchange_product_name="Бензин", date=date(2024, 3, 1))
+        for code in ("C1234567890", "A1234567890", "B1234567890")
+    ]
+
+    (products_stmt,) = ParserTrade._lookup_stmts(rows)
+
+    # Строки справочника блокируются в одном порядке во всех загрузках: без взаимных блокировок
+    assert list(products_stmt.compile().params.values())[::3] == ["A1234567890", "B1234567890", "C1234567890"]
+
+
+@pytest.mark.asyncio
+async def test_failed_save_goes_to_dead_letters(mocker):
+    parser = ParserTrade()
+    mocker.patch.object(parser, "download_xls", AsyncMock(return_value=io.BytesIO(b"xls")))
+    mocker.patch.object(parser, "parse", AsyncMock(return_value=[("A1234567890",)]))
+    mocker.patch.object(parser, "save_rows", AsyncMock(side_effect=ConnectionError("deadlock detected")))
+
+    await parser._handle_link("https://spimex.com/file.xls", datetime(2023, 1, 1))
+
+    assert parser.dead_letters == [
+        {"url": "https://spimex.com/file.xls", "date": datetime(2023, 1, 1), "error": "deadlock detected"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_parse_runs_inline_and_in_executor(mocker):
+    mock_book = create_fake_book([["", "A1234567890", "Бензин", "СПб", "100", "50000.5", "5"]])
+    mocker.patch("xlrd.open_workbook", return_value=mock_book)
+
+    # Функция разбора должна передаваться в пул процессов
+    assert pickle.loads(pickle.dumps(parse_xls)) is parse_xls
+
+    parser = ParserTrade(parse_workers=0)
+    inline_rows = await parser.parse(b"fake content", datetime(2023, 1, 1))
+
+    with ThreadPoolExecutor(1) as parser.executor:
+        pooled_rows = await parser.parse(b"fake content", datetime(2023, 1, 1))
+
+    assert inline_rows == pooled_rows == [(
+        "A1234567890", "Бензин", "A123", "456", "СПб", "0", 100, 50000, 5, datetime(2023, 1, 1).date(),
+    )]
+
+
+@pytest.mark.asyncio
+async def test_aexit_shuts_down_executor_off_the_event_loop():
+    parser = ParserTrade()
+    parser.session = MagicMock(close=AsyncMock())
+    executor = parser.executor = MagicMock()
+    threads = []
+    executor.shutdown.side_effect = lambda: threads.append(threading.get_ident())
+
+    await parser.__aexit__(None, None, None)
+
+    executor.shutdown.assert_called_once_with()
+    # Пул закрывается в отдельном потоке, цикл событий не блокируется
+    assert threads and threads[0] != threading.get_ident()
+    assert parser.executor is None
+
+
+@pytest.mark.asyncio
+async def test_run_notifies_api_once(mocker):
+    mock_session = AsyncMock()
+    mock_session_cm = AsyncMock()
+    mock_session_cm.__aenter__.return_value = mock_session
+    mocker.patch("parser_service.parser.AsyncSessionLocal", return_value=mock_session_cm)
+
+    parser = ParserTrade()
+    mocker.patch.object(parser, "_init_db", AsyncMock())
+
+    async def crawl():
+        # Два сохранённых бюллетеня, затем сбой обхода
+        parser.ingested_dates.update({date(2024, 1, 9), date(2024, 1, 10)})
+        raise ConnectionError("refused")
+
+    mocker.patch.object(parser, "request_site", side_effect=crawl)
+
+    with pytest.raises(ConnectionError):
+        await parser.run()
+
+    # Одно уведомление на все даты запуска, в том числе прерванного
+    (notify,) = (call[0][0] for call in mock_session.execute.call_args_list)
+    assert "pg_notify" in str(notify.compile())
+    assert '"start": "2024-01-09", "end": "2024-01-10"' in str(notify.compile().params)
+    assert parser.ingested_dates == set()
+
+    # Без загруженных дат уведомления нет
+    mock_session.execute.reset_mock()
+    await parser.notify_ingest()
+    mock_session.execute.assert_not_called()
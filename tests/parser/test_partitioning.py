@@ -0,0 +1,70 @@
+import pytest
+from datetime import date, datetime
+from unittest.mock import AsyncMock
+from parser_service.parser import ParserTrade
+from shared.partitioning import (
+    is_partition_table, months_ahead, months_between, partition_ddl, partition_lock_sql,
+)
+
+
+def test_months_between_crosses_year():
+    assert list(months_between(date(2023, 11, 15), date(2024, 2, 1))) == [
+        date(2023, 11, 1), date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1),
+    ]
+    assert months_ahead(date(2024, 12, 31), 2) == [date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)]
+
+
+def test_partition_ddl():
+    assert partition_ddl(date(2024, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS parsed_data_y2024m12 PARTITION OF parsed_data "
+        "FOR VALUES FROM ('2024-12-01') TO ('2025-01-01')"
+    )
+    assert partition_lock_sql(date(2024, 12, 1)) == (
+        "SELECT pg_advisory_xact_lock(hashtext('parsed_data_y2024m12'))"
+    )
+    assert is_partition_table("parsed_data_y2024m12")
+    assert not is_partition_table("parsed_data")
+
+
+@pytest.mark.asyncio
+async def test_save_rows_creates_missing_partitions_once(mocker, make_row):
+    mock_session = AsyncMock()
+    mock_session_cm = AsyncMock()
+    mock_session_cm.__aenter__.return_value = mock_session
+    mocker.patch("parser_service.parser.AsyncSessionLocal", return_value=mock_session_cm)
+
+    parser = ParserTrade()
+    parser.partitioned = True
+    parser.partitions = {date(2024, 1, 1)}
+    rows = [
+        make_row(exchange_product_id="A1234567890", date=datetime(2024, 1, 10), volume=1),
+        make_row(exchange_product_id="A1234567890", date=datetime(2024, 2, 10), volume=2),
+    ]
+
+    await parser.save_rows(rows)
+
+    statements = [str(call.args[0]) for call in mock_session.execute.call_args_list]
+    assert [s for s in statements if "PARTITION OF" in s] == [partition_ddl(date(2024, 2, 1))]
+    # Секция создаётся под блокировкой месяца: параллельная загрузка не создаст её второй раз
+    ddl_index = statements.index(partition_ddl(date(2024, 2, 1)))
+    assert statements[ddl_index - 1] == partition_lock_sql(date(2024, 2, 1))
+    assert parser.partitions == {date(2024, 1, 1), date(2024, 2, 1)}
+
+    # Секция уже создана: повторная загрузка обходится без DDL
+    mock_session.execute.reset_mock()
+    await parser.save_rows(rows)
+    assert not any("PARTITION OF" in str(call.args[0]) for call in mock_session.execute.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_save_rows_without_partitioning_skips_ddl(mocker, make_row):
+    mock_session = AsyncMock()
+    mock_session_cm = AsyncMock()
+    mock_session_cm.__aenter__.return_value = mock_session
+    mocker.patch("parser_service.parser.AsyncSessionLocal", return_value=mock_session_cm)
+
+    parser = ParserTrade()
+    await parser.save_rows([make_row(exchange_product_id="A1234567890", date=datetime(2024, 2, 10), volume=1)])
+
+    assert mock_session.execute.call_count == 4
+    assert parser.partitions == set()
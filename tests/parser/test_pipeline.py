@@ -0,0 +1,84 @@
+import asyncio
+import io
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock
+from parser_service.pipeline import PipelineParserTrade
+
+HTML_SAMPLE = """
+<div class="accordeon-inner__item">
+    <a href="/upload/oil_xls/file2.xls" class="accordeon-inner__item-title link xls">Скачать</a>
+    <span>02.01.2023</span>
+</div>
+<div class="accordeon-inner__item">
+    <a href="/upload/oil_xls/file1.xls" class="accordeon-inner__item-title link xls">Скачать</a>
+    <span>01.01.2023</span>
+</div>
+"""
+
+
+@pytest.mark.asyncio
+async def test_pipeline_passes_links_through_all_stages(mocker):
+    parser = PipelineParserTrade(max_pages=2, min_date=datetime(2023, 1, 1),
+                                 download_workers=2, parse_workers=2, queue_size=1)
+
+    async def fake_fetch_page(session, url):
+        await parser._process_links(HTML_SAMPLE.encode("utf-8"))
+
+    mocker.patch.object(parser, "_fetch_page", side_effect=fake_fetch_page)
+    mock_download = mocker.patch.object(
+        parser, "download_xls", AsyncMock(side_effect=lambda url, date: io.BytesIO(url.encode()))
+    )
+    mocker.patch.object(
+        parser, "parse", AsyncMock(side_effect=lambda content, date: [(content.decode(),)])
+    )
+    mock_save = mocker.patch.object(parser, "save_rows", AsyncMock())
+
+    await parser.request_site()
+
+    # 2 страницы по 2 бюллетеня, все строки записаны одной пачкой в конце
+    assert mock_download.call_count == 4
+    mock_save.assert_called_once()
+    saved = mock_save.call_args[0][0]
+    assert len(saved) == 4
+    assert {row[0] for row in saved} == {
+        "https://spimex.com/upload/oil_xls/file1.xls",
+        "https://spimex.com/upload/oil_xls/file2.xls",
+    }
+    assert parser.write_buffer == []
+
+
+@pytest.mark.asyncio
+async def test_pipeline_flushes_when_batch_is_full(mocker):
+    parser = PipelineParserTrade(write_batch_size=2)
+    mock_save = mocker.patch.object(parser, "save_rows", AsyncMock())
+
+    parser.write_queue = asyncio.Queue()
+    await parser.write_queue.put(("file1.xls", datetime(2023, 1, 1), [(1,)]))
+    await parser.write_queue.put(("file2.xls", datetime(2023, 1, 2), [(2,), (3,)]))
+    await parser.write_queue.put(("file3.xls", datetime(2023, 1, 3), [(4,)]))
+
+    worker = asyncio.create_task(parser._write_worker())
+    await parser.write_queue.join()
+    worker.cancel()
+
+    mock_save.assert_called_once_with([(1,), (2,), (3,)])
+    assert parser.write_buffer == [(4,)]
+    assert parser.write_sources == [("file3.xls", datetime(2023, 1, 3))]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_failed_write_sends_bulletins_to_dead_letters(mocker):
+    parser = PipelineParserTrade()
+    mocker.patch.object(parser, "save_rows", AsyncMock(side_effect=ConnectionError("refused")))
+    parser.write_buffer = [(1,), (2,)]
+    parser.write_sources = [("file1.xls", datetime(2023, 1, 1)), ("file2.xls", datetime(2023, 1, 2))]
+
+    await parser._flush_writes()
+
+    # Строки из нескольких бюллетеней не потеряны: бюллетени будут повторены
+    assert parser.dead_letters == [
+        {"url": "file1.xls", "date": datetime(2023, 1, 1), "error": "refused"},
+        {"url": "file2.xls", "date": datetime(2023, 1, 2), "error": "refused"},
+    ]
+    assert parser.write_buffer == [] and parser.write_sources == []
@@ -0,0 +1,69 @@
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock
+from aiohttp.test_utils import TestServer
+from parser_service.parser import ParserTrade
+from parser_service.replay import MANIFEST, RecordingParserTrade, create_replay_app
+
+PAGE_PATH = "/markets/oil_products/trades/results/?page=page-1&bxajaxid=d609bce6ada86eff0b6f7e49e6bae904"
+XLS_PATH = "/upload/reports/oil_xls/oil_xls_20230102162000.xls?r=1"
+
+PAGE_HTML = f"""
+<div class="accordeon-inner__item">
+    <a href="{XLS_PATH}" class="accordeon-inner__item-title link xls">Скачать</a>
+    <span>02.01.2023</span>
+</div>
+"""
+
+
+@pytest.fixture
+def fixtures_dir(tmp_path):
+    (tmp_path / "files").mkdir()
+    (tmp_path / "files" / "page").write_text(PAGE_HTML, encoding="utf-8")
+    (tmp_path / "files" / "xls").write_bytes(b"xls content")
+    manifest = {
+        PAGE_PATH: {"file": "files/page", "content_type": "text/html; charset=utf-8"},
+        XLS_PATH: {"file": "files/xls", "content_type": "application/vnd.ms-excel"},
+    }
+    (tmp_path / MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_parser_crawls_replay_server(fixtures_dir):
+    async with TestServer(create_replay_app(fixtures_dir)) as server:
+        parser = ParserTrade(max_pages=1, min_date=datetime(2023, 1, 1),
+                             base_url=str(server.make_url("/")))
+        parser.process_xls_and_save = AsyncMock()
+
+        async with parser:
+            await parser.request_site()
+
+    xls_data, date = parser.process_xls_and_save.call_args[0]
+    assert xls_data.getvalue() == b"xls content"
+    assert date == datetime(2023, 1, 2)
+    assert server.app["stats"] == {"requests": 2, "errors": 0, "not_found": 0}
+
+
+@pytest.mark.asyncio
+async def test_replay_server_injects_errors(fixtures_dir):
+    app = create_replay_app(fixtures_dir, error_rate=1.0, error_status=429)
+    async with TestServer(app) as server:
+        async with ParserTrade(base_url=str(server.make_url("/")), retry_attempts=1) as parser:
+            assert await parser.download_xls(parser.base_url + XLS_PATH) is None
+
+    assert server.app["stats"]["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_recorder_roundtrip(fixtures_dir, tmp_path_factory):
+    recorded_dir = tmp_path_factory.mktemp("recorded")
+
+    async with TestServer(create_replay_app(fixtures_dir)) as server:
+        recorder = RecordingParserTrade(recorded_dir, max_pages=1, base_url=str(server.make_url("/")))
+        await recorder.run()
+
+    manifest = json.loads((recorded_dir / MANIFEST).read_text(encoding="utf-8"))
+    assert set(manifest) == {PAGE_PATH, XLS_PATH}
+    assert (recorded_dir / manifest[XLS_PATH]["file"]).read_bytes() == b"xls content"
@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from parser_service.parser import ParserTrade
+from parser_service.scheduler import AdaptiveLimiter, RetryPolicy
+
+URL = "https://spimex.com/upload/oil_xls/file.xls"
+
+
+def make_response_cm(status, content=b"", headers=None):
+    response = MagicMock()
+    response.status = status
+    response.headers = headers or {}
+    response.read = AsyncMock(return_value=content)
+
+    response_cm = MagicMock()
+    response_cm.__aenter__ = AsyncMock(return_value=response)
+    response_cm.__aexit__ = AsyncMock(return_value=False)
+    return response_cm
+
+
+def test_limiter_aimd():
+    limiter = AdaptiveLimiter(8, max_limit=8)
+
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    for _ in range(10):
+        limiter.on_throttle()
+    assert limiter.limit == 1
+
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 8
+
+
+@pytest.mark.asyncio
+async def test_limiter_decreases_once_per_window():
+    limiter = AdaptiveLimiter(8)
+
+    # Ответы на запросы, отправленные до снижения, сообщают об одной перегрузке
+    requests = [await limiter.__aenter__() for _ in range(3)]
+    for request in requests:
+        limiter.on_throttle(request)
+    assert limiter.limit == 4
+
+    # Запрос после снижения снова может уменьшить лимит
+    request = await limiter.__aenter__()
+    limiter.on_throttle(request)
+    assert limiter.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_caps_in_flight_requests():
+    limiter = AdaptiveLimiter(2)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with limiter:
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(request() for _ in range(6)))
+    assert peak == 2
+
+
+def test_retry_delay_is_bounded():
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    assert all(0 <= policy.delay(attempt) <= 5 for attempt in range(1, 10))
+    assert policy.delay(1, retry_after=3) == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_retries_and_shrinks_concurrency():
+    parser = ParserTrade(limit_per_host=8, retry_base_delay=0)
+    parser.session = MagicMock()
+    parser.session.get.side_effect = [
+        make_response_cm(503),
+        make_response_cm(429, headers={"Retry-After": "0"}),
+        make_response_cm(200, b"xls content"),
+    ]
+
+    assert await parser.fetch(URL) == b"xls content"
+    assert parser.session.get.call_count == 3
+    assert 2 <= parser.limiter.limit < 3
+    assert parser.dead_letters == []
+
+
+@pytest.mark.asyncio
+async def test_failed_download_goes_to_dead_letters(tmp_path):
+    parser = ParserTrade(retry_attempts=2, retry_base_delay=0)
+    parser.session = MagicMock()
+    parser.session.get.side_effect = lambda *args, **kwargs: make_response_cm(500)
+
+    date = datetime(2023, 1, 2)
+    assert await parser.download_xls(URL, date=date) is None
+    assert parser.dead_letters == [{"url": URL, "date": date, "error": "статус 500"}]
+
+    path = tmp_path / "dead_letters.json"
+    parser.save_dead_letters(path)
+    parser.dead_letters = []
+    parser.load_dead_letters(path)
+
+    parser._handle_link = AsyncMock()
+    await parser.retry_dead_letters()
+    parser._handle_link.assert_called_once_with(URL, date)
+    assert parser.dead_letters == []
+
+
+@pytest.mark.asyncio
+async def test_not_found_is_not_retried(capsys):
+    parser = ParserTrade(retry_base_delay=0)
+    parser.session = MagicMock()
+    parser.session.get.return_value = make_response_cm(404)
+
+    assert await parser.fetch(URL) is None
+    parser.session.get.assert_called_once()
+    assert "статус 404" in capsys.readouterr().out
+    assert parser.dead_letters[0]["error"] == "статус 404"
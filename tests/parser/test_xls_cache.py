@@ -0,0 +1,75 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from parser_service.parser import ParserTrade
+from parser_service.xls_cache import XlsCache
+
+URL = "https://spimex.com/upload/oil_xls/file.xls"
+
+
+def make_session(status, content=b"", headers=None):
+    response = MagicMock()
+    response.status = status
+    response.headers = headers or {}
+    response.read = AsyncMock(return_value=content)
+
+    response_cm = MagicMock()
+    response_cm.__aenter__ = AsyncMock(return_value=response)
+    response_cm.__aexit__ = AsyncMock(return_value=False)
+
+    session = MagicMock()
+    session.get.return_value = response_cm
+    return session
+
+
+@pytest.mark.asyncio
+async def test_cache_roundtrip(tmp_path):
+    cache = XlsCache(tmp_path)
+    assert await cache.get(URL) is None
+
+    entry = await cache.put(URL, b"xls content", etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+
+    assert await cache.get(URL) == entry
+    assert await cache.read(entry) == b"xls content"
+    assert XlsCache.conditional_headers(entry) == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+
+@pytest.mark.asyncio
+async def test_download_stores_and_revalidates(tmp_path):
+    parser = ParserTrade(cache_dir=tmp_path)
+
+    parser.session = make_session(200, b"xls content", {"ETag": '"v1"'})
+    first = await parser.download_xls(URL)
+    assert parser.session.get.call_args.kwargs["headers"] == {}
+
+    parser.session = make_session(304)
+    second = await parser.download_xls(URL)
+    assert parser.session.get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+    assert first.getvalue() == second.getvalue() == b"xls content"
+
+
+@pytest.mark.asyncio
+async def test_download_falls_back_to_cache_on_error(tmp_path):
+    parser = ParserTrade(cache_dir=tmp_path, retry_attempts=1)
+    await parser.cache.put(URL, b"xls content")
+
+    parser.session = MagicMock()
+    parser.session.get.side_effect = OSError("network is unreachable")
+
+    result = await parser.download_xls(URL)
+    assert result.getvalue() == b"xls content"
+    assert parser.dead_letters == []
+
+
+@pytest.mark.asyncio
+async def test_offline_mode_never_uses_network(tmp_path):
+    parser = ParserTrade(cache_dir=tmp_path, offline=True)
+    await parser.cache.put(URL, b"xls content")
+    parser.session = MagicMock()
+
+    assert (await parser.download_xls(URL)).getvalue() == b"xls content"
+    assert await parser.download_xls(URL + "?missing") is None
+    parser.session.get.assert_not_called()